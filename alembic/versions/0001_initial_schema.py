@@ -0,0 +1,141 @@
+"""Esquema inicial (tabelas criadas antes pelo create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+Bancos já existentes, criados pelo antigo Base.metadata.create_all, devem ser
+marcados com `alembic stamp 0001` antes do primeiro `alembic upgrade head`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('full_name', sa.String(length=255), nullable=False),
+    sa.Column('role', sa.Enum('GESTOR', 'ENGENHEIRO', name='userrole'), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_table('obras',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(length=255), nullable=False),
+    sa.Column('descricao', sa.Text(), nullable=True),
+    sa.Column('endereco', sa.String(length=500), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('gestor_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['gestor_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_obras_id'), 'obras', ['id'], unique=False)
+    op.create_table('checkins',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('engineer_id', sa.Integer(), nullable=False),
+    sa.Column('obra_id', sa.Integer(), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.Column('checkin_time', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['engineer_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['obra_id'], ['obras.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_checkins_id'), 'checkins', ['id'], unique=False)
+    op.create_table('checklist_templates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('obra_id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(length=255), nullable=False),
+    sa.Column('descricao', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['obra_id'], ['obras.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_checklist_templates_id'), 'checklist_templates', ['id'], unique=False)
+    op.create_table('obra_engineers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('obra_id', sa.Integer(), nullable=False),
+    sa.Column('engineer_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['engineer_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['obra_id'], ['obras.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_obra_engineers_id'), 'obra_engineers', ['id'], unique=False)
+    op.create_table('checklist_submissions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=False),
+    sa.Column('engineer_id', sa.Integer(), nullable=False),
+    sa.Column('submitted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['engineer_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['template_id'], ['checklist_templates.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_checklist_submissions_id'), 'checklist_submissions', ['id'], unique=False)
+    op.create_table('checklist_template_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=False),
+    sa.Column('titulo', sa.String(length=255), nullable=False),
+    sa.Column('descricao', sa.Text(), nullable=True),
+    sa.Column('ordem', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['template_id'], ['checklist_templates.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_checklist_template_items_id'), 'checklist_template_items', ['id'], unique=False)
+    op.create_table('checklist_item_responses',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('submission_id', sa.Integer(), nullable=False),
+    sa.Column('template_item_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('PENDENTE', 'CONFORME', 'NAO_CONFORME', 'NAO_APLICAVEL', name='checkliststatus'), nullable=False),
+    sa.Column('observacao', sa.Text(), nullable=True),
+    sa.Column('foto_url', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['submission_id'], ['checklist_submissions.id'], ),
+    sa.ForeignKeyConstraint(['template_item_id'], ['checklist_template_items.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_checklist_item_responses_id'), 'checklist_item_responses', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_checklist_item_responses_id'), table_name='checklist_item_responses')
+    op.drop_table('checklist_item_responses')
+    op.drop_index(op.f('ix_checklist_template_items_id'), table_name='checklist_template_items')
+    op.drop_table('checklist_template_items')
+    op.drop_index(op.f('ix_checklist_submissions_id'), table_name='checklist_submissions')
+    op.drop_table('checklist_submissions')
+    op.drop_index(op.f('ix_obra_engineers_id'), table_name='obra_engineers')
+    op.drop_table('obra_engineers')
+    op.drop_index(op.f('ix_checklist_templates_id'), table_name='checklist_templates')
+    op.drop_table('checklist_templates')
+    op.drop_index(op.f('ix_checkins_id'), table_name='checkins')
+    op.drop_table('checkins')
+    op.drop_index(op.f('ix_obras_id'), table_name='obras')
+    op.drop_table('obras')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    sa.Enum(name='checkliststatus').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='userrole').drop(op.get_bind(), checkfirst=True)
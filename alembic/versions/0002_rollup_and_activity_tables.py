@@ -0,0 +1,64 @@
+"""Rollup diário por obra e feed de atividades
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:01
+
+Tabelas preenchidas na escrita a partir desta versão. Para incluir o histórico
+já existente, rodar `python rebuild_stats.py` após o upgrade.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('obra_daily_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('gestor_id', sa.Integer(), nullable=False),
+    sa.Column('obra_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('checkins', sa.Integer(), nullable=False),
+    sa.Column('submissions', sa.Integer(), nullable=False),
+    sa.Column('conforme', sa.Integer(), nullable=False),
+    sa.Column('nao_conforme', sa.Integer(), nullable=False),
+    sa.Column('pendente', sa.Integer(), nullable=False),
+    sa.Column('nao_aplicavel', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['gestor_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['obra_id'], ['obras.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_obra_daily_stats_gestor_day', 'obra_daily_stats', ['gestor_id', 'day'], unique=False)
+    op.create_index('ix_obra_daily_stats_obra_day', 'obra_daily_stats', ['obra_id', 'day'], unique=True)
+    op.create_table('activity_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('gestor_id', sa.Integer(), nullable=False),
+    sa.Column('obra_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.String(length=20), nullable=False),
+    sa.Column('ref_id', sa.Integer(), nullable=False),
+    sa.Column('obra_nome', sa.String(), nullable=False),
+    sa.Column('usuario_nome', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['gestor_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['obra_id'], ['obras.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_activity_events_gestor_created', 'activity_events', ['gestor_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_activity_events_gestor_created', table_name='activity_events')
+    op.drop_table('activity_events')
+    op.drop_index('ix_obra_daily_stats_obra_day', table_name='obra_daily_stats')
+    op.drop_index('ix_obra_daily_stats_gestor_day', table_name='obra_daily_stats')
+    op.drop_table('obra_daily_stats')
@@ -0,0 +1,58 @@
+"""Índices compostos para as consultas mais frequentes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:02
+
+Criados com CONCURRENTLY (fora de transação) para não bloquear escritas em
+tabelas já grandes.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# nome -> (tabela, colunas, unique)
+INDEXES = {
+    'ix_obra_engineers_engineer_obra': ('obra_engineers', ['engineer_id', 'obra_id'], True),
+    'ix_obra_engineers_obra': ('obra_engineers', ['obra_id', 'engineer_id'], False),
+    'ix_obras_gestor': ('obras', ['gestor_id'], False),
+    'ix_checklist_templates_obra': ('checklist_templates', ['obra_id'], False),
+    'ix_checklist_template_items_template': ('checklist_template_items', ['template_id', 'ordem'], False),
+    'ix_checkins_engineer_time': ('checkins', ['engineer_id', 'checkin_time', 'id'], False),
+    'ix_checkins_obra_time': ('checkins', ['obra_id', 'checkin_time', 'id'], False),
+    'ix_checklist_submissions_engineer_time': ('checklist_submissions', ['engineer_id', 'submitted_at', 'id'], False),
+    'ix_checklist_submissions_template_time': ('checklist_submissions', ['template_id', 'submitted_at', 'id'], False),
+    'ix_checklist_item_responses_submission': ('checklist_item_responses', ['submission_id'], False),
+}
+
+
+def upgrade() -> None:
+    # Vínculos duplicados impediriam o índice único (add_engineer já evita novos)
+    op.execute(
+        """
+        DELETE FROM obra_engineers a
+        USING obra_engineers b
+        WHERE a.engineer_id = b.engineer_id AND a.obra_id = b.obra_id AND a.id > b.id
+        """
+    )
+    with op.get_context().autocommit_block():
+        for name, (table, columns, unique) in INDEXES.items():
+            op.create_index(
+                name, table, columns, unique=unique,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, (table, _, _) in INDEXES.items():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
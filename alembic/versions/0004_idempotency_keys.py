@@ -0,0 +1,44 @@
+"""Chaves de idempotência em check-ins e submissões
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:03
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('checkins', sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+    op.add_column('checklist_submissions', sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ux_checkins_engineer_idempotency', 'checkins', ['engineer_id', 'idempotency_key'],
+            unique=True, postgresql_where=sa.text('idempotency_key IS NOT NULL'),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ux_checklist_submissions_engineer_idempotency', 'checklist_submissions', ['engineer_id', 'idempotency_key'],
+            unique=True, postgresql_where=sa.text('idempotency_key IS NOT NULL'),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ux_checklist_submissions_engineer_idempotency', table_name='checklist_submissions',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ux_checkins_engineer_idempotency', table_name='checkins',
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column('checklist_submissions', 'idempotency_key')
+    op.drop_column('checkins', 'idempotency_key')
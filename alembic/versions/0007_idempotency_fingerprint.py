@@ -0,0 +1,28 @@
+"""Digest do pedido gravado junto com a chave de idempotência
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:06
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('checkins', sa.Column('request_fingerprint', sa.LargeBinary(length=16), nullable=True))
+    op.add_column('checklist_submissions', sa.Column('request_fingerprint', sa.LargeBinary(length=16), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('checklist_submissions', 'request_fingerprint')
+    op.drop_column('checkins', 'request_fingerprint')
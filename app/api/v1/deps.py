@@ -1,74 +1,204 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import Generator, Optional, Union
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from jose import JWTError
 
-from app.database.database import get_db
+from app.database.database import get_db, get_async_db
 from app.core.security import decode_access_token
 from app.models.models import User, UserRole
-from app.crud import crud_user
+from app.crud import crud_user, crud_obra
+from app.services.token_service import token_service
+from app.services.user_cache import UserPrincipal, user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"/api/v1/auth/login")
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> User:
-    """Obtém o usuário autenticado pelo token JWT"""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+
+def _token_payload(token: str) -> dict:
+    """Valida o access token (assinatura, expiração, revogação) e retorna suas claims"""
     payload = decode_access_token(token)
-    if payload is None:
-        raise credentials_exception
-    
-    user_id: Optional[int] = payload.get("sub")
-    if user_id is None:
-        raise credentials_exception
-    
-    user = crud_user.get(db, id=int(user_id))
-    if user is None:
-        raise credentials_exception
-    
-    return user
+    if payload is None or payload.get("sub") is None:
+        raise _credentials_exception()
+    # Tokens antigos (sem iat) não são revogáveis: dependem da consulta ao banco
+    if "iat" in payload and token_service.is_revoked(int(payload["sub"]), payload["iat"]):
+        raise _credentials_exception()
+    return payload
 
 
-def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
-    """Obtém o usuário ativo atual"""
-    if not current_user.is_active:
+def _user_id_from_token(token: str) -> int:
+    """Extrai o id do usuário do token JWT"""
+    return int(_token_payload(token)["sub"])
+
+
+def _principal_from_claims(payload: dict) -> Optional[UserPrincipal]:
+    """Identidade direto das claims do access token (None para tokens antigos, sem papel)"""
+    role = payload.get("role")
+    if role is None:
+        return None
+    return UserPrincipal(id=int(payload["sub"]), role=UserRole(role), is_active=bool(payload.get("active")))
+
+
+def _check_active(user: Union[User, UserPrincipal]) -> Union[User, UserPrincipal]:
+    if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
         )
-    return current_user
+    return user
 
 
-def get_current_gestor(
-    current_user: User = Depends(get_current_active_user),
-) -> User:
-    """Verifica se o usuário atual é um gestor"""
-    if current_user.role != UserRole.GESTOR:
+def _check_gestor(user: UserPrincipal) -> UserPrincipal:
+    if user.role != UserRole.GESTOR:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions. Gestor role required."
         )
-    return current_user
+    return user
 
 
-def get_current_engineer(
-    current_user: User = Depends(get_current_active_user),
-) -> User:
-    """Verifica se o usuário atual é um engenheiro"""
-    if current_user.role != UserRole.ENGENHEIRO:
+def _check_engineer(user: UserPrincipal) -> UserPrincipal:
+    if user.role != UserRole.ENGENHEIRO:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"Not enough permissions. Engineer role required. Current role: {current_user.role}"
+            detail=f"Not enough permissions. Engineer role required. Current role: {user.role}"
         )
-    return current_user
+    return user
+
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+) -> User:
+    """Obtém o usuário autenticado pelo token JWT"""
+    user = crud_user.get(db, id=_user_id_from_token(token))
+    if user is None:
+        raise _credentials_exception()
+
+    return user
+
+
+def get_current_active_user(
+    current_user: User = Depends(get_current_user),
+) -> User:
+    """Obtém o usuário ativo atual"""
+    return _check_active(current_user)
+
+
+def get_current_principal(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+) -> UserPrincipal:
+    """Obtém a identidade do usuário autenticado (claims do token; banco só para tokens antigos)"""
+    payload = _token_payload(token)
+    principal = _principal_from_claims(payload)
+    if principal is not None:
+        return principal
+    user_id = int(payload["sub"])
+    principal = user_cache.get(user_id, token)
+    if principal is None:
+        user = crud_user.get(db, id=user_id)
+        if user is None:
+            raise _credentials_exception()
+        principal = user_cache.set(user_id, token, UserPrincipal.from_user(user))
+    return principal
+
+
+def get_current_active_principal(
+    principal: UserPrincipal = Depends(get_current_principal),
+) -> UserPrincipal:
+    """Obtém a identidade do usuário ativo atual"""
+    return _check_active(principal)
+
+
+def get_current_gestor(
+    current_user: UserPrincipal = Depends(get_current_active_principal),
+) -> UserPrincipal:
+    """Verifica se o usuário atual é um gestor"""
+    return _check_gestor(current_user)
+
+
+def get_current_engineer(
+    current_user: UserPrincipal = Depends(get_current_active_principal),
+) -> UserPrincipal:
+    """Verifica se o usuário atual é um engenheiro"""
+    return _check_engineer(current_user)
+
+
+# Dependências assíncronas (rotas async com AsyncSession)
+
+async def get_current_principal_async(
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(oauth2_scheme)
+) -> UserPrincipal:
+    """Obtém a identidade do usuário autenticado (sessão assíncrona)"""
+    payload = _token_payload(token)
+    principal = _principal_from_claims(payload)
+    if principal is not None:
+        return principal
+    user_id = int(payload["sub"])
+    principal = user_cache.get(user_id, token)
+    if principal is None:
+        user = await crud_user.get_async(db, id=user_id)
+        if user is None:
+            raise _credentials_exception()
+        principal = user_cache.set(user_id, token, UserPrincipal.from_user(user))
+    return principal
+
+
+async def get_current_active_principal_async(
+    principal: UserPrincipal = Depends(get_current_principal_async),
+) -> UserPrincipal:
+    """Obtém a identidade do usuário ativo atual (sessão assíncrona)"""
+    return _check_active(principal)
+
+
+async def get_current_gestor_async(
+    current_user: UserPrincipal = Depends(get_current_active_principal_async),
+) -> UserPrincipal:
+    """Verifica se o usuário atual é um gestor (sessão assíncrona)"""
+    return _check_gestor(current_user)
+
+
+async def get_current_engineer_async(
+    current_user: UserPrincipal = Depends(get_current_active_principal_async),
+) -> UserPrincipal:
+    """Verifica se o usuário atual é um engenheiro (sessão assíncrona)"""
+    return _check_engineer(current_user)
+
+
+async def check_engineer_obra_access(
+    db: AsyncSession,
+    *,
+    obra_id: int,
+    engineer: UserPrincipal,
+    detail: str = "Not enough permissions",
+) -> None:
+    """Garante que o engenheiro está atribuído à obra"""
+    if not await crud_obra.engineer_has_access_async(db, obra_id=obra_id, engineer_id=engineer.id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+
+
+async def get_engineer_obra_id(
+    obra_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_engineer_async),
+) -> int:
+    """Dependency para rotas /obras/{obra_id}: verifica o acesso do engenheiro"""
+    await check_engineer_obra_access(db, obra_id=obra_id, engineer=current_user)
+    return obra_id
+
+
+def get_idempotency_key(
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=64),
+) -> Optional[str]:
+    """Chave gerada pelo app: retries do mesmo POST devolvem a resposta original"""
+    return idempotency_key
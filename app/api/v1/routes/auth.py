@@ -1,10 +1,11 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database.database import get_db
+from app.database.database import get_async_db, get_db
 from app.api.v1.deps import get_current_active_user
-from app.schemas.schemas import UserCreate, UserResponse, UserUpdate, LoginRequest, Token
+from app.schemas.schemas import UserCreate, UserResponse, UserUpdate, LoginRequest, Token, RefreshRequest
 from app.crud import crud_user
 from app.services.auth_service import auth_service
 from app.models.models import User
@@ -13,27 +14,47 @@ router = APIRouter()
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     credentials: LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Login de usuário (gestor ou engenheiro)"""
-    return auth_service.login(db, credentials)
+    # Async: o bcrypt roda no pool dedicado sem ocupar uma thread do threadpool das rotas
+    return await auth_service.login(db, credentials)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_token(
+    request: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Renovar o access token (o refresh token usado deixa de valer e um novo é retornado)"""
+    return await auth_service.refresh(db, request)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    request: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Encerrar a sessão: revoga o refresh token (o access token expira sozinho)"""
+    await auth_service.logout(db, request)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(
+async def register(
     user_in: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Registrar novo usuário"""
-    user = crud_user.get_by_email(db, email=user_in.email)
+    user = await crud_user.get_by_email_async(db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    user = crud_user.create(db, obj_in=user_in)
+    user = await crud_user.create_async(db, obj_in=user_in)
     return user
 
 
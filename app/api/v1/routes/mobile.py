@@ -1,155 +1,275 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.database import get_db
-from app.api.v1.deps import get_current_engineer
+from app.database.database import get_async_db
+from app.api.v1.deps import (
+    get_current_engineer_async,
+    get_engineer_obra_id,
+    get_idempotency_key,
+    check_engineer_obra_access,
+)
 from app.schemas.schemas import (
     ObraResponse,
     CheckInCreate,
     CheckInResponse,
     ChecklistTemplateResponse,
     ChecklistSubmissionCreate,
-    ChecklistSubmissionResponse
+    ChecklistSubmissionResponse,
+    PhotoPresignRequest,
+    PhotoConfirmRequest,
+    MobileSyncRequest,
+    MobileSyncResponse,
+    MobileCatalogDelta,
 )
 from app.crud import crud_obra, crud_checkin, crud_checklist_template, crud_checklist_submission
-from app.models.models import User
+from app.services.user_cache import UserPrincipal
 from app.services.file_service import file_service
+from app.services.idempotency import idempotency_store
+from app.services.sync_service import sync_service
+from app.services.template_cache import template_cache
+from app.utils.http_cache import json_response, not_modified
+from app.utils.pagination import decode_cursor
 
 router = APIRouter()
 
 
 @router.get("/obras", response_model=List[ObraResponse])
-def list_my_obras(
+async def list_my_obras(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_engineer)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_engineer_async)
 ):
     """Listar obras atribuídas ao engenheiro"""
-    obras = crud_obra.get_by_engineer(db, engineer_id=current_user.id, skip=skip, limit=limit)
-    return obras
+    obras = await crud_obra.get_by_engineer_async(db, engineer_id=current_user.id, skip=skip, limit=limit)
+    return not_modified(request, response, obras) or obras
+
+
+@router.get("/catalog", response_model=MobileCatalogDelta)
+async def get_catalog_delta(
+    since: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_engineer_async)
+):
+    """Obras e checklists alterados desde ?since= (watermark da resposta anterior)"""
+    return await sync_service.catalog_delta(db, engineer_id=current_user.id, since=since)
 
 
 @router.get("/obras/{obra_id}", response_model=ObraResponse)
-def get_obra(
-    obra_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_engineer)
+async def get_obra(
+    request: Request,
+    response: Response,
+    obra_id: int = Depends(get_engineer_obra_id),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Obter detalhes de uma obra"""
-    # Verificar se o engenheiro tem acesso a essa obra
-    obras = crud_obra.get_by_engineer(db, engineer_id=current_user.id)
-    obra_ids = [obra.id for obra in obras]
-    
-    if obra_id not in obra_ids:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    obra = crud_obra.get(db, id=obra_id)
+    obra = await crud_obra.get_async(db, id=obra_id)
     if not obra:
         raise HTTPException(status_code=404, detail="Obra not found")
     
-    return obra
+    return not_modified(request, response, obra) or obra
 
 
 @router.post("/checkin", response_model=CheckInResponse, status_code=status.HTTP_201_CREATED)
-def create_checkin(
+async def create_checkin(
     checkin_in: CheckInCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_engineer)
+    response: Response,
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_engineer_async)
 ):
-    """Fazer check-in na obra"""
+    """Fazer check-in na obra (retries com o mesmo Idempotency-Key não duplicam)"""
+    if idempotency_key:
+        replay = await idempotency_store.replay(
+            user_id=current_user.id, scope="checkin", key=idempotency_key, request=checkin_in,
+            response_model=CheckInResponse,
+            load=lambda: crud_checkin.get_by_idempotency_key_async(
+                db, engineer_id=current_user.id, idempotency_key=idempotency_key
+            ),
+        )
+        if replay is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+            return replay
+
     # Verificar se o engenheiro tem acesso a essa obra
-    obras = crud_obra.get_by_engineer(db, engineer_id=current_user.id)
-    obra_ids = [obra.id for obra in obras]
-    
-    if checkin_in.obra_id not in obra_ids:
-        raise HTTPException(status_code=403, detail="Not authorized for this obra")
+    await check_engineer_obra_access(
+        db, obra_id=checkin_in.obra_id, engineer=current_user,
+        detail="Not authorized for this obra"
+    )
     
-    checkin = crud_checkin.create_checkin(db, obj_in=checkin_in, engineer_id=current_user.id)
+    checkin = await crud_checkin.create_checkin_async(
+        db, obj_in=checkin_in, engineer_id=current_user.id, idempotency_key=idempotency_key
+    )
+    if idempotency_key:
+        return idempotency_store.set(
+            current_user.id, "checkin", idempotency_key, checkin_in, CheckInResponse.model_validate(checkin)
+        )
     return checkin
 
 
 @router.get("/checkins", response_model=List[CheckInResponse])
-def list_my_checkins(
+async def list_my_checkins(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_engineer)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_engineer_async)
 ):
-    """Listar meus check-ins"""
-    checkins = crud_checkin.get_by_engineer(db, engineer_id=current_user.id, skip=skip, limit=limit)
-    return checkins
+    """Listar meus check-ins (próxima página: ?cursor= do último item)"""
+    checkins = await crud_checkin.get_by_engineer_async(
+        db, engineer_id=current_user.id, skip=skip, limit=limit, before=decode_cursor(cursor)
+    )
+    return not_modified(request, response, checkins) or checkins
 
 
 @router.get("/obras/{obra_id}/checklists", response_model=List[ChecklistTemplateResponse])
-def list_obra_checklists(
-    obra_id: int,
+async def list_obra_checklists(
+    request: Request,
+    obra_id: int = Depends(get_engineer_obra_id),
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_engineer)
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Listar checklists disponíveis para a obra"""
-    # Verificar se o engenheiro tem acesso a essa obra
-    obras = crud_obra.get_by_engineer(db, engineer_id=current_user.id)
-    obra_ids = [obra.id for obra in obras]
-    
-    if obra_id not in obra_ids:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    templates = crud_checklist_template.get_by_obra(db, obra_id=obra_id, skip=skip, limit=limit)
-    return templates
+    cached = await template_cache.get_or_load_async(
+        obra_id, skip, limit,
+        load=lambda: crud_checklist_template.get_by_obra_async(db, obra_id=obra_id, skip=skip, limit=limit),
+    )
+    return json_response(request, cached.body, cached.etag)
 
 
 @router.post("/checklists/submit", response_model=ChecklistSubmissionResponse, status_code=status.HTTP_201_CREATED)
-def submit_checklist(
+async def submit_checklist(
     submission_in: ChecklistSubmissionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_engineer)
+    response: Response,
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_engineer_async)
 ):
-    """Submeter um checklist preenchido"""
+    """Submeter um checklist preenchido (retries com o mesmo Idempotency-Key não duplicam)"""
+    if idempotency_key:
+        replay = await idempotency_store.replay(
+            user_id=current_user.id, scope="submission", key=idempotency_key, request=submission_in,
+            response_model=ChecklistSubmissionResponse,
+            load=lambda: crud_checklist_submission.get_by_idempotency_key_async(
+                db, engineer_id=current_user.id, idempotency_key=idempotency_key
+            ),
+        )
+        if replay is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+            return replay
+
     # Verificar se o template existe
-    template = crud_checklist_template.get(db, id=submission_in.template_id)
+    template = await crud_checklist_template.get_async(db, id=submission_in.template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Checklist template not found")
     
     # Verificar se o engenheiro tem acesso à obra desse template
-    obras = crud_obra.get_by_engineer(db, engineer_id=current_user.id)
-    obra_ids = [obra.id for obra in obras]
-    
-    if template.obra_id not in obra_ids:
-        raise HTTPException(status_code=403, detail="Not authorized for this checklist")
+    await check_engineer_obra_access(
+        db, obra_id=template.obra_id, engineer=current_user,
+        detail="Not authorized for this checklist"
+    )
+
+    # Verificar se os items respondidos pertencem ao template
+    invalid_items = await crud_checklist_template.get_invalid_item_ids_async(
+        db,
+        template_id=submission_in.template_id,
+        item_ids=[r.template_item_id for r in submission_in.responses],
+    )
+    if invalid_items:
+        raise HTTPException(status_code=400, detail=f"Invalid template items: {invalid_items}")
     
-    submission = crud_checklist_submission.create_submission(
-        db, obj_in=submission_in, engineer_id=current_user.id
+    submission = await crud_checklist_submission.create_submission_async(
+        db, obj_in=submission_in, engineer_id=current_user.id, idempotency_key=idempotency_key
     )
+    if idempotency_key:
+        return idempotency_store.set(
+            current_user.id, "submission", idempotency_key, submission_in,
+            ChecklistSubmissionResponse.model_validate(submission),
+        )
     return submission
 
 
 @router.get("/checklists/submissions", response_model=List[ChecklistSubmissionResponse])
-def list_my_submissions(
+async def list_my_submissions(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_engineer)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_engineer_async)
 ):
-    """Listar minhas submissões de checklist"""
-    submissions = crud_checklist_submission.get_by_engineer(
-        db, engineer_id=current_user.id, skip=skip, limit=limit
+    """Listar minhas submissões de checklist (próxima página: ?cursor= do último item)"""
+    submissions = await crud_checklist_submission.get_by_engineer_async(
+        db, engineer_id=current_user.id, skip=skip, limit=limit, before=decode_cursor(cursor)
     )
-    return submissions
+    return not_modified(request, response, submissions) or submissions
+
+
+@router.post("/sync", response_model=MobileSyncResponse)
+async def sync_offline(
+    sync_in: MobileSyncRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_engineer_async)
+):
+    """Enviar em lote check-ins e checklists feitos offline (resultado por item)"""
+    return await sync_service.sync(db, sync_in=sync_in, engineer_id=current_user.id)
+
+
+def _photo_response(filepath: str) -> dict:
+    return {
+        "filename": filepath,
+        "url": file_service.get_file_url(filepath),
+        "variants": file_service.get_variant_urls(filepath),
+        "manifest": file_service.get_manifest_url(filepath),
+    }
 
 
 @router.post("/upload-photo")
 async def upload_photo(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_engineer)
+    current_user: UserPrincipal = Depends(get_current_engineer_async)
 ):
     """Upload de foto para o checklist"""
     try:
         filepath = await file_service.save_checklist_photo(file)
-        file_url = file_service.get_file_url(filepath)
-        return {"filename": filepath, "url": file_url}
+        # Thumbnails e WebP gerados após a resposta
+        background_tasks.add_task(file_service.generate_derivatives, filepath)
+        return _photo_response(filepath)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/upload-photo/presign")
+async def presign_photo_upload(
+    upload_in: PhotoPresignRequest,
+    current_user: UserPrincipal = Depends(get_current_engineer_async)
+):
+    """Gerar upload direto da foto para o storage (S3), sem passar pela API"""
+    result = await file_service.presign_checklist_photo(
+        sha256=upload_in.sha256,
+        content_type=upload_in.content_type,
+        size=upload_in.size,
+    )
+    result["url"] = file_service.get_file_url(result["filename"])
+    return result
+
+
+@router.post("/upload-photo/confirm")
+async def confirm_photo_upload(
+    confirm_in: PhotoConfirmRequest,
+    background_tasks: BackgroundTasks,
+    current_user: UserPrincipal = Depends(get_current_engineer_async)
+):
+    """Confirmar upload direto e gerar os derivados da foto"""
+    filepath = await file_service.confirm_checklist_photo(confirm_in.filename)
+    background_tasks.add_task(file_service.generate_derivatives, filepath)
+    return _photo_response(filepath)
@@ -1,5 +1,6 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.database.database import get_db
@@ -17,7 +18,10 @@ from app.schemas.schemas import (
     CheckInResponse
 )
 from app.crud import crud_obra, crud_checklist_template, crud_user, crud_checkin, crud_checklist_submission
-from app.models.models import User
+from app.services.user_cache import UserPrincipal
+from app.services.template_cache import template_cache
+from app.utils.http_cache import json_response, not_modified
+from app.utils.pagination import decode_cursor
 
 router = APIRouter()
 
@@ -26,7 +30,7 @@ router = APIRouter()
 def create_obra(
     obra_in: ObraCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_gestor)
+    current_user: UserPrincipal = Depends(get_current_gestor)
 ):
     """Criar nova obra (apenas gestores)"""
     obra = crud_obra.create_with_gestor(db, obj_in=obra_in, gestor_id=current_user.id)
@@ -35,24 +39,28 @@ def create_obra(
 
 @router.get("/", response_model=List[ObraResponse])
 def list_obras(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_gestor)
+    current_user: UserPrincipal = Depends(get_current_gestor)
 ):
     """Listar obras do gestor"""
     obras = crud_obra.get_by_gestor(db, gestor_id=current_user.id, skip=skip, limit=limit)
-    return obras
+    return not_modified(request, response, obras) or obras
 
 
 @router.get("/{obra_id}", response_model=ObraDetailResponse)
 def get_obra(
     obra_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_gestor)
+    current_user: UserPrincipal = Depends(get_current_gestor)
 ):
     """Obter detalhes de uma obra"""
-    obra = crud_obra.get(db, id=obra_id)
+    obra = crud_obra.get_with_details(db, id=obra_id)
     if not obra:
         raise HTTPException(status_code=404, detail="Obra not found")
     if obra.gestor_id != current_user.id:
@@ -60,6 +68,13 @@ def get_obra(
     
     # Transformar ObraEngineer em User para serialização correta
     engineers_list = [oe.engineer for oe in obra.engineers]
+
+    # Atribuições e items entram no ETag: mudam o payload sem alterar a obra
+    related = [*obra.engineers, *engineers_list, *obra.checklist_templates]
+    related += [item for template in obra.checklist_templates for item in template.items]
+    cached = not_modified(request, response, obra, related=related)
+    if cached is not None:
+        return cached
     
     # Criar resposta com dados transformados
     return {
@@ -82,7 +97,7 @@ def update_obra(
     obra_id: int,
     obra_in: ObraUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_gestor)
+    current_user: UserPrincipal = Depends(get_current_gestor)
 ):
     """Atualizar obra"""
     obra = crud_obra.get(db, id=obra_id)
@@ -98,7 +113,7 @@ def update_obra(
 def delete_obra(
     obra_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_gestor)
+    current_user: UserPrincipal = Depends(get_current_gestor)
 ):
     """Deletar obra"""
     obra = crud_obra.get(db, id=obra_id)
@@ -106,7 +121,14 @@ def delete_obra(
         raise HTTPException(status_code=404, detail="Obra not found")
     if obra.gestor_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    crud_obra.remove(db, id=obra_id)
+    try:
+        crud_obra.remove(db, id=obra_id)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Obra has check-ins or checklist submissions; deactivate it instead",
+        )
     return None
 
 
@@ -116,7 +138,7 @@ def add_engineer_to_obra(
     obra_id: int,
     engineer_data: ObraEngineerCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_gestor)
+    current_user: UserPrincipal = Depends(get_current_gestor)
 ):
     """Adicionar engenheiro à obra"""
     obra = crud_obra.get(db, id=obra_id)
@@ -139,7 +161,7 @@ def remove_engineer_from_obra(
     obra_id: int,
     engineer_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_gestor)
+    current_user: UserPrincipal = Depends(get_current_gestor)
 ):
     """Remover engenheiro da obra"""
     obra = crud_obra.get(db, id=obra_id)
@@ -157,8 +179,10 @@ def remove_engineer_from_obra(
 @router.get("/{obra_id}/engineers", response_model=List[UserResponse])
 def list_obra_engineers(
     obra_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_gestor)
+    current_user: UserPrincipal = Depends(get_current_gestor)
 ):
     """Listar engenheiros da obra"""
     obra = crud_obra.get(db, id=obra_id)
@@ -168,7 +192,7 @@ def list_obra_engineers(
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     engineers = crud_obra.get_engineers(db, obra_id=obra_id)
-    return engineers
+    return not_modified(request, response, engineers) or engineers
 
 
 # Gerenciar checklists da obra
@@ -177,7 +201,7 @@ def create_checklist_template(
     obra_id: int,
     checklist_in: ChecklistTemplateCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_gestor)
+    current_user: UserPrincipal = Depends(get_current_gestor)
 ):
     """Criar template de checklist para a obra"""
     obra = crud_obra.get(db, id=obra_id)
@@ -193,10 +217,11 @@ def create_checklist_template(
 @router.get("/{obra_id}/checklists", response_model=List[ChecklistTemplateResponse])
 def list_checklist_templates(
     obra_id: int,
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_gestor)
+    current_user: UserPrincipal = Depends(get_current_gestor)
 ):
     """Listar templates de checklist da obra"""
     obra = crud_obra.get(db, id=obra_id)
@@ -205,43 +230,56 @@ def list_checklist_templates(
     if obra.gestor_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    templates = crud_checklist_template.get_by_obra(db, obra_id=obra_id, skip=skip, limit=limit)
-    return templates
+    cached = template_cache.get_or_load(
+        obra_id, skip, limit,
+        load=lambda: crud_checklist_template.get_by_obra(db, obra_id=obra_id, skip=skip, limit=limit),
+    )
+    return json_response(request, cached.body, cached.etag)
 
 
 @router.get("/{obra_id}/checkins", response_model=List[CheckInResponse])
 def list_obra_checkins(
     obra_id: int,
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_gestor)
+    current_user: UserPrincipal = Depends(get_current_gestor)
 ):
-    """Listar todos os check-ins de uma obra (para o gestor)"""
+    """Listar todos os check-ins de uma obra (para o gestor; próxima página: ?cursor= do último item)"""
     obra = crud_obra.get(db, id=obra_id)
     if not obra:
         raise HTTPException(status_code=404, detail="Obra not found")
     if obra.gestor_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    checkins = crud_checkin.get_by_obra(db, obra_id=obra_id, skip=skip, limit=limit)
-    return checkins
+    checkins = crud_checkin.get_by_obra(
+        db, obra_id=obra_id, skip=skip, limit=limit, before=decode_cursor(cursor)
+    )
+    return not_modified(request, response, checkins) or checkins
 
 
 @router.get("/{obra_id}/checklist-submissions", response_model=List[ChecklistSubmissionResponse])
 def list_obra_submissions(
     obra_id: int,
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_gestor)
+    current_user: UserPrincipal = Depends(get_current_gestor)
 ):
-    """Listar todas as submissões de checklist de uma obra (para o gestor)"""
+    """Listar todas as submissões de checklist de uma obra (para o gestor; próxima página: ?cursor= do último item)"""
     obra = crud_obra.get(db, id=obra_id)
     if not obra:
         raise HTTPException(status_code=404, detail="Obra not found")
     if obra.gestor_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    submissions = crud_checklist_submission.get_by_obra(db, obra_id=obra_id, skip=skip, limit=limit)
-    return submissions
+    submissions = crud_checklist_submission.get_by_obra(
+        db, obra_id=obra_id, skip=skip, limit=limit, before=decode_cursor(cursor)
+    )
+    return not_modified(request, response, submissions) or submissions
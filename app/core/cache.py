@@ -0,0 +1,319 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional
+from app.core.config import settings
+
+
+class TTLCache:
+    """Cache LRU em memória com expiração por item (thread-safe)"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> Any:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove as chaves que satisfazem o predicado e retorna quantas foram removidas"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Camada de cache compartilhada (backend configurável + mensagens de invalidação entre workers)
+
+class CacheBackend(ABC):
+    """Interface do cache compartilhado: chaves str, valores bytes, mensagens de invalidação"""
+
+    shared = False  # True: mesmo conteúdo visto por todos os workers
+
+    def __init__(self):
+        self._handlers: List[Callable[[str], None]] = []
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Valor da chave (None se ausente/expirada)"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        """Grava o valor (ttl em segundos; None = sem expiração)"""
+
+    @abstractmethod
+    def add(self, key: str, value: bytes, ttl: Optional[int] = None) -> bool:
+        """Grava só se a chave não existir; retorna se gravou"""
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        """Remove as chaves"""
+
+    @abstractmethod
+    def publish(self, message: str) -> None:
+        """Envia uma mensagem de invalidação a todos os workers (inclusive este)"""
+
+    @abstractmethod
+    def take_token(self, key: str, capacity: int, refill_rate: float) -> float:
+        """Token bucket: consome 1 token; retorna 0 se permitido ou os segundos até o próximo token"""
+
+    def subscribe(self, handler: Callable[[str], None]) -> None:
+        """Registra um handler para as mensagens de invalidação"""
+        self._handlers.append(handler)
+
+    def start(self) -> None:
+        """Inicia o recebimento de mensagens (no startup da aplicação)"""
+
+    def close(self) -> None:
+        """Encerra conexões e o recebimento de mensagens"""
+
+    def _dispatch(self, message: str) -> None:
+        for handler in self._handlers:
+            try:
+                handler(message)
+            except Exception as e:
+                print(f"Error handling cache invalidation {message!r}: {e}")
+
+    # Variantes assíncronas: backends remotos rodam a chamada fora do event loop
+
+    async def get_async(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    async def add_async(self, key: str, value: bytes, ttl: Optional[int] = None) -> bool:
+        return await asyncio.to_thread(self.add, key, value, ttl)
+
+    async def take_token_async(self, key: str, capacity: int, refill_rate: float) -> float:
+        return await asyncio.to_thread(self.take_token, key, capacity, refill_rate)
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Cache LRU no próprio processo (um worker; mensagens entregues localmente)"""
+
+    def __init__(self, maxsize: int = 4096):
+        super().__init__()
+        self._cache = TTLCache(maxsize=maxsize, ttl=float("inf"))
+        self._lock = threading.Lock()
+
+    def _ttl(self, ttl: Optional[int]) -> float:
+        return float("inf") if ttl is None else ttl
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        self._cache.set(key, value, self._ttl(ttl))
+
+    def add(self, key: str, value: bytes, ttl: Optional[int] = None) -> bool:
+        with self._lock:
+            if self._cache.get(key) is not None:
+                return False
+            self._cache.set(key, value, self._ttl(ttl))
+            return True
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.delete(key)
+
+    def publish(self, message: str) -> None:
+        self._dispatch(message)
+
+    def take_token(self, key: str, capacity: int, refill_rate: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._cache.get(key) or (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / refill_rate
+            if not wait:
+                tokens -= 1
+            # Bucket cheio de novo equivale a chave ausente: expira após recarregar
+            self._cache.set(key, (tokens, now), capacity / refill_rate)
+            return wait
+
+    # Sem I/O: não vale a troca de thread
+
+    async def get_async(self, key: str) -> Optional[bytes]:
+        return self.get(key)
+
+    async def set_async(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        self.set(key, value, ttl)
+
+    async def add_async(self, key: str, value: bytes, ttl: Optional[int] = None) -> bool:
+        return self.add(key, value, ttl)
+
+    async def take_token_async(self, key: str, capacity: int, refill_rate: float) -> float:
+        return self.take_token(key, capacity, refill_rate)
+
+
+# Token bucket atômico no Redis: estado (tokens, instante) num hash que expira ao recarregar
+_TAKE_TOKEN_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis (ou compatível: Valkey, KeyDB, fakeredis) compartilhado entre workers e servidores.
+
+    Falhas do Redis viram cache miss: a requisição segue lendo do banco.
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        *,
+        client=None,
+        prefix: str = "sst:",
+        channel: Optional[str] = None,
+    ):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires redis (pip install redis)") from e
+
+        super().__init__()
+        self._errors = (redis.RedisError, OSError)
+        self.client = client if client is not None else redis.Redis.from_url(
+            url, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+        self.prefix = prefix
+        self.channel = channel or f"{prefix}invalidate"
+        self._take_token = self.client.register_script(_TAKE_TOKEN_SCRIPT)
+        self._pubsub = None
+        self._thread = None
+
+    def _warn(self, op: str, error: Exception) -> None:
+        print(f"Warning: cache {op} failed: {error}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self.client.get(self.prefix + key)
+        except self._errors as e:
+            self._warn("get", e)
+            return None
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        try:
+            self.client.set(self.prefix + key, value, ex=ttl)
+        except self._errors as e:
+            self._warn("set", e)
+
+    def add(self, key: str, value: bytes, ttl: Optional[int] = None) -> bool:
+        try:
+            return bool(self.client.set(self.prefix + key, value, ex=ttl, nx=True))
+        except self._errors as e:
+            self._warn("add", e)
+            return False
+
+    def delete(self, *keys: str) -> None:
+        try:
+            self.client.delete(*(self.prefix + key for key in keys))
+        except self._errors as e:
+            self._warn("delete", e)
+
+    def publish(self, message: str) -> None:
+        try:
+            self.client.publish(self.channel, message)
+        except self._errors as e:
+            # Sem Redis: outros workers só descartam a entrada ao expirar o TTL local
+            self._warn("publish", e)
+
+    def take_token(self, key: str, capacity: int, refill_rate: float) -> float:
+        try:
+            # Relógio do worker (servidores sincronizados por NTP)
+            wait = self._take_token(keys=[self.prefix + key], args=[capacity, refill_rate, time.time()])
+            return float(wait)
+        except self._errors as e:
+            # Sem Redis o limite é desligado (fail open) em vez de derrubar a API
+            self._warn("rate limit", e)
+            return 0.0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.channel: self._on_message})
+        self._thread = self._pubsub.run_in_thread(
+            sleep_time=1.0, daemon=True, exception_handler=self._on_listener_error
+        )
+
+    def _on_message(self, message: dict) -> None:
+        data = message["data"]
+        self._dispatch(data.decode() if isinstance(data, bytes) else data)
+
+    def _on_listener_error(self, error: Exception, pubsub, thread) -> None:
+        # Conexão perdida: tentar de novo (o pubsub se reinscreve ao reconectar)
+        self._warn("subscribe", error)
+        time.sleep(1.0)
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+        self.client.close()
+
+
+_backend: Optional[CacheBackend] = None
+
+
+def get_cache_backend() -> CacheBackend:
+    """Backend configurado em CACHE_BACKEND (uma instância por processo)"""
+    global _backend
+    if _backend is None:
+        if settings.CACHE_BACKEND == "redis":
+            _backend = RedisCacheBackend(settings.REDIS_URL, prefix=settings.CACHE_KEY_PREFIX)
+        else:
+            _backend = MemoryCacheBackend(maxsize=settings.CACHE_MAX_SIZE)
+    return _backend
@@ -0,0 +1,79 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+from app.core.config import settings
+
+
+# Biblioteca JWT configurável (JWT_BACKEND): tokens HS256 são compatíveis entre elas
+
+class JWTBackend(ABC):
+    """Assinatura e verificação de tokens JWT"""
+
+    name = ""
+
+    @abstractmethod
+    def encode(self, claims: dict, key: str, algorithm: str) -> str:
+        """Token assinado com as claims"""
+
+    @abstractmethod
+    def decode(self, token: str, key: str, algorithms: List[str]) -> Optional[dict]:
+        """Claims do token; None se a assinatura for inválida ou o token expirou"""
+
+
+class JoseJWTBackend(JWTBackend):
+    """python-jose"""
+
+    name = "jose"
+
+    def __init__(self):
+        from jose import JWTError, jwt
+
+        self._jwt = jwt
+        self._errors = (JWTError,)
+
+    def encode(self, claims: dict, key: str, algorithm: str) -> str:
+        return self._jwt.encode(claims, key, algorithm=algorithm)
+
+    def decode(self, token: str, key: str, algorithms: List[str]) -> Optional[dict]:
+        try:
+            return self._jwt.decode(token, key, algorithms=algorithms)
+        except self._errors:
+            return None
+
+
+class PyJWTBackend(JWTBackend):
+    """PyJWT (decodificação ~2-3x mais rápida que a python-jose)"""
+
+    name = "pyjwt"
+
+    def __init__(self):
+        try:
+            import jwt
+        except ImportError as e:
+            raise RuntimeError("JWT_BACKEND=pyjwt requires PyJWT (pip install PyJWT)") from e
+
+        self._jwt = jwt
+        self._errors = (jwt.PyJWTError,)
+
+    def encode(self, claims: dict, key: str, algorithm: str) -> str:
+        return self._jwt.encode(claims, key, algorithm=algorithm)
+
+    def decode(self, token: str, key: str, algorithms: List[str]) -> Optional[dict]:
+        try:
+            return self._jwt.decode(token, key, algorithms=algorithms)
+        except self._errors:
+            return None
+
+
+JWT_BACKENDS = {backend.name: backend for backend in (JoseJWTBackend, PyJWTBackend)}
+
+_backends: Dict[str, JWTBackend] = {}
+
+
+def get_jwt_backend(name: Optional[str] = None) -> JWTBackend:
+    """Backend configurado em JWT_BACKEND (uma instância por processo)"""
+    name = name or settings.JWT_BACKEND
+    if name not in _backends:
+        if name not in JWT_BACKENDS:
+            raise ValueError(f"Unknown JWT_BACKEND: {name!r} (expected one of {sorted(JWT_BACKENDS)})")
+        _backends[name] = JWT_BACKENDS[name]()
+    return _backends[name]
@@ -1,8 +1,13 @@
+import time
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
 import bcrypt
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.jwt_backend import get_jwt_backend
+
+# Access tokens já verificados -> claims (o mesmo app repete o token até ele expirar)
+_verified_tokens = TTLCache(maxsize=settings.JWT_CACHE_MAX_SIZE, ttl=settings.JWT_CACHE_TTL_SECONDS)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -17,11 +22,20 @@ def get_password_hash(password: str) -> str:
     """Gera hash da senha"""
     # Truncar senha para 72 bytes (limite do bcrypt)
     password_bytes = password.encode('utf-8')[:72]
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Indica se o hash foi gerado com um custo diferente de BCRYPT_ROUNDS"""
+    # Formato: $2b$<custo>$<salt+hash>
+    parts = hashed_password.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return True
+    return int(parts[2]) != settings.BCRYPT_ROUNDS
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Cria um token JWT"""
     to_encode = data.copy()
@@ -30,15 +44,48 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    # iat com fração de segundo: comparado ao instante de revogação do usuário
+    to_encode.update({"exp": expire, "iat": time.time(), "type": "access"})
+    encoded_jwt = get_jwt_backend().encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
+def create_refresh_token(user_id: int, *, jti: str, family: str, expires_at: datetime) -> str:
+    """Cria um refresh token de uso único; family agrupa os tokens gerados por rotação"""
+    to_encode = {
+        "sub": str(user_id),
+        "type": "refresh",
+        "jti": jti,
+        "fam": family,
+        "iat": time.time(),
+        "exp": expires_at,
+    }
+    return get_jwt_backend().encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def _decode_token(token: str) -> Optional[dict]:
+    return get_jwt_backend().decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
 def decode_access_token(token: str) -> Optional[dict]:
     """Decodifica um token JWT"""
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    payload = _verified_tokens.get(token)
+    if payload is not None:
         return payload
-    except JWTError:
+    payload = _decode_token(token)
+    # Refresh tokens não valem como access token (tokens antigos não têm "type")
+    if payload is None or payload.get("type", "access") != "access":
+        return None
+    # Só até o exp: um token expirado nunca sai do cache (só tokens válidos entram)
+    ttl = min(settings.JWT_CACHE_TTL_SECONDS, payload.get("exp", 0) - time.time())
+    if ttl > 0:
+        _verified_tokens.set(token, payload, ttl)
+    return payload
+
+
+def decode_refresh_token(token: str) -> Optional[dict]:
+    """Decodifica um refresh token"""
+    payload = _decode_token(token)
+    if payload is None or payload.get("type") != "refresh":
         return None
+    return payload
@@ -3,6 +3,10 @@ from app.crud.crud_obra import crud_obra
 from app.crud.crud_checklist import crud_checklist_template
 from app.crud.crud_checkin import crud_checkin
 from app.crud.crud_submission import crud_checklist_submission
+from app.crud.crud_stats import crud_obra_daily_stats
+from app.crud.crud_activity import crud_activity_event
+from app.crud.crud_tombstone import crud_sync_tombstone
+from app.crud.crud_refresh_token import crud_refresh_token
 
 __all__ = [
     "crud_user",
@@ -10,4 +14,8 @@ __all__ = [
     "crud_checklist_template",
     "crud_checkin",
     "crud_checklist_submission",
+    "crud_obra_daily_stats",
+    "crud_activity_event",
+    "crud_sync_tombstone",
+    "crud_refresh_token",
 ]
@@ -0,0 +1,129 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import Integer, String, column, delete, literal, select, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.models import (
+    ActivityEvent,
+    Obra,
+    User,
+    CheckIn,
+    ChecklistTemplate,
+    ChecklistSubmission,
+)
+from app.utils.pagination import keyset_page
+
+EVENT_COLUMNS = ["gestor_id", "obra_id", "user_id", "tipo", "ref_id", "obra_nome", "usuario_nome"]
+
+
+class CRUDActivityEvent:
+    """Feed de atividades: uma linha por check-in/submissão, com nomes desnormalizados"""
+
+    def _insert(self, source):
+        return ActivityEvent.__table__.insert().from_select(EVENT_COLUMNS, source)
+
+    def _event_columns(self, *, tipo: str, ref_id: int):
+        """gestor/obra/nomes lidos da obra e do usuário no próprio INSERT ... SELECT"""
+        return (
+            Obra.gestor_id, Obra.id, User.id, literal(tipo), literal(ref_id), Obra.nome, User.full_name,
+        )
+
+    def _checkin_stmt(self, *, obra_id: int, user_id: int, ref_id: int):
+        return self._insert(
+            select(*self._event_columns(tipo="checkin", ref_id=ref_id))
+            .select_from(Obra)
+            .join(User, User.id == user_id)
+            .filter(Obra.id == obra_id)
+        )
+
+    def _submission_stmt(self, *, template_id: int, user_id: int, ref_id: int):
+        return self._insert(
+            select(*self._event_columns(tipo="checklist", ref_id=ref_id))
+            .select_from(ChecklistTemplate)
+            .join(Obra, ChecklistTemplate.obra_id == Obra.id)
+            .join(User, User.id == user_id)
+            .filter(ChecklistTemplate.id == template_id)
+        )
+
+    def record_checkin(self, db: Session, *, obra_id: int, user_id: int, ref_id: int) -> None:
+        db.execute(self._checkin_stmt(obra_id=obra_id, user_id=user_id, ref_id=ref_id))
+
+    def record_submission(self, db: Session, *, template_id: int, user_id: int, ref_id: int) -> None:
+        db.execute(self._submission_stmt(template_id=template_id, user_id=user_id, ref_id=ref_id))
+
+    async def record_checkin_async(
+        self, db: AsyncSession, *, obra_id: int, user_id: int, ref_id: int
+    ) -> None:
+        await db.execute(self._checkin_stmt(obra_id=obra_id, user_id=user_id, ref_id=ref_id))
+
+    async def record_submission_async(
+        self, db: AsyncSession, *, template_id: int, user_id: int, ref_id: int
+    ) -> None:
+        await db.execute(self._submission_stmt(template_id=template_id, user_id=user_id, ref_id=ref_id))
+
+    async def record_many_async(
+        self, db: AsyncSession, *, user_id: int, events: List[Tuple[str, int, int]]
+    ) -> None:
+        """Registra vários eventos (tipo, obra_id, ref_id) do usuário em um único INSERT ... SELECT"""
+        if not events:
+            return
+        batch = values(
+            column("tipo", String), column("obra_id", Integer), column("ref_id", Integer), name="batch"
+        ).data(events)
+        await db.execute(self._insert(
+            select(
+                Obra.gestor_id, Obra.id, User.id, batch.c.tipo, batch.c.ref_id, Obra.nome, User.full_name,
+            )
+            .select_from(batch)
+            .join(Obra, Obra.id == batch.c.obra_id)
+            .join(User, User.id == user_id)
+        ))
+
+    async def get_feed_async(
+        self,
+        db: AsyncSession,
+        *,
+        gestor_id: int,
+        limit: int = 10,
+        before: Optional[Tuple[datetime, int]] = None,
+    ) -> List[ActivityEvent]:
+        """Atividades mais recentes do gestor, anteriores ao cursor (created_at, id)"""
+        query = select(ActivityEvent).filter(ActivityEvent.gestor_id == gestor_id)
+        result = await db.execute(
+            keyset_page(query, ActivityEvent.created_at, ActivityEvent.id, before).limit(limit)
+        )
+        return list(result.scalars().all())
+
+    def rebuild(self, db: Session) -> None:
+        """Recria o feed a partir dos check-ins e submissões existentes"""
+        db.execute(delete(ActivityEvent))
+        columns = EVENT_COLUMNS + ["created_at"]
+
+        checkins = (
+            select(
+                Obra.gestor_id, Obra.id, User.id, literal("checkin"), CheckIn.id,
+                Obra.nome, User.full_name, CheckIn.checkin_time,
+            )
+            .select_from(CheckIn)
+            .join(Obra, CheckIn.obra_id == Obra.id)
+            .join(User, CheckIn.engineer_id == User.id)
+            .order_by(CheckIn.checkin_time, CheckIn.id)
+        )
+        db.execute(ActivityEvent.__table__.insert().from_select(columns, checkins))
+
+        submissions = (
+            select(
+                Obra.gestor_id, Obra.id, User.id, literal("checklist"), ChecklistSubmission.id,
+                Obra.nome, User.full_name, ChecklistSubmission.submitted_at,
+            )
+            .select_from(ChecklistSubmission)
+            .join(ChecklistTemplate, ChecklistSubmission.template_id == ChecklistTemplate.id)
+            .join(Obra, ChecklistTemplate.obra_id == Obra.id)
+            .join(User, ChecklistSubmission.engineer_id == User.id)
+            .order_by(ChecklistSubmission.submitted_at, ChecklistSubmission.id)
+        )
+        db.execute(ActivityEvent.__table__.insert().from_select(columns, submissions))
+        db.commit()
+
+
+crud_activity_event = CRUDActivityEvent()
@@ -1,8 +1,21 @@
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, violated_constraint
+from app.utils.pagination import keyset_page
+from app.crud.crud_stats import crud_obra_daily_stats
+from app.crud.crud_activity import crud_activity_event
 from app.models.models import CheckIn
 from app.schemas.schemas import CheckInCreate, CheckInResponse
+from app.services.dashboard_cache import dashboard_cache
+from app.services.idempotency import idempotency_store
+
+# Índice único (engineer_id, idempotency_key) da migração 0004
+IDEMPOTENCY_INDEX = "ux_checkins_engineer_idempotency"
 
 
 class CRUDCheckIn(CRUDBase[CheckIn, CheckInCreate, CheckInResponse]):
@@ -14,33 +27,164 @@ class CRUDCheckIn(CRUDBase[CheckIn, CheckInCreate, CheckInResponse]):
             engineer_id=engineer_id,
         )
         db.add(db_obj)
+        db.flush()  # Para obter o ID antes do commit
+
+        # Rollup diário e feed de atividades na mesma transação
+        gestor_id = crud_obra_daily_stats.record_checkin(db, obra_id=obj_in.obra_id)
+        crud_activity_event.record_checkin(
+            db, obra_id=obj_in.obra_id, user_id=engineer_id, ref_id=db_obj.id
+        )
         db.commit()
+        dashboard_cache.bump(gestor_id)
         db.refresh(db_obj)
         return db_obj
 
     def get_by_engineer(
-        self, db: Session, *, engineer_id: int, skip: int = 0, limit: int = 100
+        self, db: Session, *, engineer_id: int, skip: int = 0, limit: int = 100,
+        before: Optional[Tuple[datetime, int]] = None
     ) -> List[CheckIn]:
-        return (
+        query = (
             db.query(CheckIn)
             .filter(CheckIn.engineer_id == engineer_id)
-            .order_by(CheckIn.checkin_time.desc())
+        )
+        return (
+            keyset_page(query, CheckIn.checkin_time, CheckIn.id, before)
             .offset(skip)
             .limit(limit)
             .all()
         )
 
     def get_by_obra(
-        self, db: Session, *, obra_id: int, skip: int = 0, limit: int = 100
+        self, db: Session, *, obra_id: int, skip: int = 0, limit: int = 100,
+        before: Optional[Tuple[datetime, int]] = None
     ) -> List[CheckIn]:
-        return (
+        query = (
             db.query(CheckIn)
             .filter(CheckIn.obra_id == obra_id)
-            .order_by(CheckIn.checkin_time.desc())
+        )
+        return (
+            keyset_page(query, CheckIn.checkin_time, CheckIn.id, before)
             .offset(skip)
             .limit(limit)
             .all()
         )
 
+    # Variantes assíncronas
+
+    async def create_checkin_async(
+        self, db: AsyncSession, *, obj_in: CheckInCreate, engineer_id: int,
+        idempotency_key: Optional[str] = None
+    ) -> CheckIn:
+        db_obj = CheckIn(
+            **obj_in.dict(),
+            engineer_id=engineer_id,
+            idempotency_key=idempotency_key,
+            request_fingerprint=idempotency_store.fingerprint(obj_in) if idempotency_key else None,
+        )
+        db.add(db_obj)
+        try:
+            await db.flush()  # Para obter o ID antes do commit
+        except IntegrityError as e:
+            # Só a chave repetida é retry concorrente; FK/outras violações sobem como erro
+            if idempotency_key is None or violated_constraint(e) != IDEMPOTENCY_INDEX:
+                raise
+            # Retry concorrente com a mesma chave já gravou o check-in
+            await db.rollback()
+            existing = await self.get_by_idempotency_key_async(
+                db, engineer_id=engineer_id, idempotency_key=idempotency_key
+            )
+            if existing is None:
+                raise
+            return existing
+
+        gestor_id = await crud_obra_daily_stats.record_checkin_async(db, obra_id=obj_in.obra_id)
+        await crud_activity_event.record_checkin_async(
+            db, obra_id=obj_in.obra_id, user_id=engineer_id, ref_id=db_obj.id
+        )
+        await db.commit()
+        await dashboard_cache.bump_async(gestor_id)
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def get_by_idempotency_key_async(
+        self, db: AsyncSession, *, engineer_id: int, idempotency_key: str
+    ) -> Optional[CheckIn]:
+        result = await db.execute(
+            select(CheckIn).filter(
+                CheckIn.engineer_id == engineer_id,
+                CheckIn.idempotency_key == idempotency_key,
+            )
+        )
+        return result.scalars().first()
+
+    async def create_many_async(
+        self, db: AsyncSession, *, objs_in: Dict[str, CheckInCreate], engineer_id: int
+    ) -> Dict[str, int]:
+        """Insere vários check-ins (chave -> dados) em um único INSERT, sem commit.
+
+        Chaves já existentes são ignoradas (ON CONFLICT); retorna chave -> id dos criados.
+        """
+        if not objs_in:
+            return {}
+        stmt = (
+            pg_insert(CheckIn)
+            .values([
+                {**obj_in.dict(include={"obra_id", "latitude", "longitude"}),
+                 "engineer_id": engineer_id, "idempotency_key": key,
+                 "request_fingerprint": idempotency_store.fingerprint(obj_in)}
+                for key, obj_in in objs_in.items()
+            ])
+            .on_conflict_do_nothing(
+                index_elements=["engineer_id", "idempotency_key"],
+                index_where=CheckIn.idempotency_key.isnot(None),
+            )
+            .returning(CheckIn.idempotency_key, CheckIn.id)
+        )
+        return dict((await db.execute(stmt)).all())
+
+    async def get_ids_by_keys_async(
+        self, db: AsyncSession, *, engineer_id: int, keys: List[str]
+    ) -> Dict[str, int]:
+        """Check-ins já registrados com as chaves de idempotência informadas"""
+        if not keys:
+            return {}
+        result = await db.execute(
+            select(CheckIn.idempotency_key, CheckIn.id).filter(
+                CheckIn.engineer_id == engineer_id,
+                CheckIn.idempotency_key.in_(keys),
+            )
+        )
+        return dict(result.all())
+
+    async def get_by_engineer_async(
+        self, db: AsyncSession, *, engineer_id: int, skip: int = 0, limit: int = 100,
+        before: Optional[Tuple[datetime, int]] = None
+    ) -> List[CheckIn]:
+        query = (
+            select(CheckIn)
+            .filter(CheckIn.engineer_id == engineer_id)
+        )
+        result = await db.execute(
+            keyset_page(query, CheckIn.checkin_time, CheckIn.id, before)
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_by_obra_async(
+        self, db: AsyncSession, *, obra_id: int, skip: int = 0, limit: int = 100,
+        before: Optional[Tuple[datetime, int]] = None
+    ) -> List[CheckIn]:
+        query = (
+            select(CheckIn)
+            .filter(CheckIn.obra_id == obra_id)
+        )
+        result = await db.execute(
+            keyset_page(query, CheckIn.checkin_time, CheckIn.id, before)
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
 
 crud_checkin = CRUDCheckIn(CheckIn)
@@ -1,8 +1,13 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from app.crud.base import CRUDBase
-from app.models.models import ChecklistTemplate, ChecklistTemplateItem
+from app.crud.crud_tombstone import crud_sync_tombstone
+from app.models.models import ChecklistTemplate, ChecklistTemplateItem, Obra, ObraEngineer
 from app.schemas.schemas import ChecklistTemplateCreate, ChecklistTemplateUpdate
+from app.services.template_cache import template_cache
 
 
 class CRUDChecklistTemplate(CRUDBase[ChecklistTemplate, ChecklistTemplateCreate, ChecklistTemplateUpdate]):
@@ -18,29 +23,75 @@ class CRUDChecklistTemplate(CRUDBase[ChecklistTemplate, ChecklistTemplateCreate,
         db.add(db_obj)
         db.flush()  # Para obter o ID antes do commit
         
-        # Criar os items
-        for item_data in obj_in.items:
-            db_item = ChecklistTemplateItem(
-                **item_data.dict(),
-                template_id=db_obj.id
-            )
-            db.add(db_item)
+        # Criar os items (um único INSERT multi-linha)
+        rows = [{**item_data.dict(), "template_id": db_obj.id} for item_data in obj_in.items]
+        if rows:
+            db.execute(insert(ChecklistTemplateItem), rows)
         
         db.commit()
+        template_cache.bump(obra_id)
+        return self.get_with_items(db, id=db_obj.id)
+
+    def update(
+        self, db: Session, *, db_obj: ChecklistTemplate,
+        obj_in: Union[ChecklistTemplateUpdate, Dict[str, Any]]
+    ) -> ChecklistTemplate:
+        was_active = bool(db_obj.is_active)
+        self._apply_update(db_obj, obj_in)
+        if was_active and not db_obj.is_active:
+            # Template desativado some do app dos engenheiros da obra no próximo sync incremental
+            crud_sync_tombstone.record_for_obra(
+                db, obra_id=db_obj.obra_id, entity="template", entity_id=db_obj.id
+            )
+        db.add(db_obj)
+        db.commit()
+        template_cache.bump(db_obj.obra_id)
         db.refresh(db_obj)
         return db_obj
 
+    def remove(self, db: Session, *, id: int) -> ChecklistTemplate:
+        """Remove o template e seus items (IntegrityError se já tiver submissões)"""
+        template = db.get(ChecklistTemplate, id)
+        crud_sync_tombstone.record_for_obra(db, obra_id=template.obra_id, entity="template", entity_id=id)
+        db.delete(template)
+        db.commit()
+        template_cache.bump(template.obra_id)
+        return template
+
+    def get_with_items(self, db: Session, *, id: int) -> Optional[ChecklistTemplate]:
+        return (
+            db.query(ChecklistTemplate)
+            .options(selectinload(ChecklistTemplate.items))
+            .filter(ChecklistTemplate.id == id)
+            .populate_existing()
+            .first()
+        )
+
     def get_by_obra(
         self, db: Session, *, obra_id: int, skip: int = 0, limit: int = 100
     ) -> List[ChecklistTemplate]:
         return (
             db.query(ChecklistTemplate)
+            .options(selectinload(ChecklistTemplate.items))
             .filter(ChecklistTemplate.obra_id == obra_id)
             .offset(skip)
             .limit(limit)
             .all()
         )
 
+    def _item_ids_query(self, *, template_id: int, item_ids: List[int]):
+        return select(ChecklistTemplateItem.id).filter(
+            ChecklistTemplateItem.template_id == template_id,
+            ChecklistTemplateItem.id.in_(set(item_ids)),
+        )
+
+    def get_invalid_item_ids(
+        self, db: Session, *, template_id: int, item_ids: List[int]
+    ) -> List[int]:
+        """IDs que não pertencem ao template (validação em uma única query)"""
+        valid = set(db.scalars(self._item_ids_query(template_id=template_id, item_ids=item_ids)))
+        return sorted(set(item_ids) - valid)
+
     def add_item(
         self, db: Session, *, template_id: int, titulo: str, descricao: Optional[str] = None, ordem: int = 0
     ) -> ChecklistTemplateItem:
@@ -51,7 +102,9 @@ class CRUDChecklistTemplate(CRUDBase[ChecklistTemplate, ChecklistTemplateCreate,
             ordem=ordem
         )
         db.add(db_obj)
+        obra_id = self._touch(db, template_id=template_id)
         db.commit()
+        template_cache.bump(obra_id)
         db.refresh(db_obj)
         return db_obj
 
@@ -59,9 +112,91 @@ class CRUDChecklistTemplate(CRUDBase[ChecklistTemplate, ChecklistTemplateCreate,
         obj = db.query(ChecklistTemplateItem).filter(ChecklistTemplateItem.id == item_id).first()
         if obj:
             db.delete(obj)
+            obra_id = self._touch(db, template_id=obj.template_id)
+            crud_sync_tombstone.record_for_obra(db, obra_id=obra_id, entity="template_item", entity_id=item_id)
             db.commit()
+            template_cache.bump(obra_id)
             return True
         return False
 
+    def _touch(self, db: Session, *, template_id: int) -> int:
+        """Marca o template como alterado (sync incremental reenvia com todos os items); retorna a obra"""
+        return db.scalar(
+            update(ChecklistTemplate)
+            .where(ChecklistTemplate.id == template_id)
+            .values(updated_at=func.now())
+            .returning(ChecklistTemplate.obra_id)
+        )
+
+    # Variantes assíncronas (items carregados antecipadamente: sem lazy load em async)
+
+    async def get_invalid_item_ids_async(
+        self, db: AsyncSession, *, template_id: int, item_ids: List[int]
+    ) -> List[int]:
+        """IDs que não pertencem ao template (validação em uma única query)"""
+        result = await db.scalars(self._item_ids_query(template_id=template_id, item_ids=item_ids))
+        return sorted(set(item_ids) - set(result.all()))
+
+    async def get_item_ids_by_template_async(
+        self, db: AsyncSession, *, template_ids: Iterable[int]
+    ) -> Dict[int, Tuple[int, Set[int]]]:
+        """template_id -> (obra_id, IDs dos items) dos templates existentes, em uma única query"""
+        result = await db.execute(
+            select(ChecklistTemplate.id, ChecklistTemplate.obra_id, ChecklistTemplateItem.id)
+            .outerjoin(ChecklistTemplateItem, ChecklistTemplateItem.template_id == ChecklistTemplate.id)
+            .filter(ChecklistTemplate.id.in_(set(template_ids)))
+        )
+        templates: Dict[int, Tuple[int, Set[int]]] = {}
+        for template_id, obra_id, item_id in result.all():
+            _, item_ids = templates.setdefault(template_id, (obra_id, set()))
+            if item_id is not None:
+                item_ids.add(item_id)
+        return templates
+
+    async def get_changed_for_engineer_async(
+        self, db: AsyncSession, *, engineer_id: int, since: Optional[datetime] = None
+    ) -> List[ChecklistTemplate]:
+        """Templates ativos (com items) das obras ativas do engenheiro alterados após o watermark; todos se since=None"""
+        query = (
+            select(ChecklistTemplate)
+            .options(selectinload(ChecklistTemplate.items))
+            .join(ObraEngineer, ObraEngineer.obra_id == ChecklistTemplate.obra_id)
+            .join(Obra, Obra.id == ChecklistTemplate.obra_id)
+            .filter(
+                ObraEngineer.engineer_id == engineer_id,
+                ChecklistTemplate.is_active == True,
+                Obra.is_active == True,
+            )
+        )
+        if since is not None:
+            query = query.filter(or_(
+                func.coalesce(ChecklistTemplate.updated_at, ChecklistTemplate.created_at) > since,
+                ObraEngineer.created_at > since,
+            ))
+        result = await db.execute(query.order_by(ChecklistTemplate.id))
+        return list(result.scalars().all())
+
+    async def get_with_items_async(
+        self, db: AsyncSession, *, id: int
+    ) -> Optional[ChecklistTemplate]:
+        result = await db.execute(
+            select(ChecklistTemplate)
+            .options(selectinload(ChecklistTemplate.items))
+            .filter(ChecklistTemplate.id == id)
+        )
+        return result.scalars().first()
+
+    async def get_by_obra_async(
+        self, db: AsyncSession, *, obra_id: int, skip: int = 0, limit: int = 100
+    ) -> List[ChecklistTemplate]:
+        result = await db.execute(
+            select(ChecklistTemplate)
+            .options(selectinload(ChecklistTemplate.items))
+            .filter(ChecklistTemplate.obra_id == obra_id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
 
 crud_checklist_template = CRUDChecklistTemplate(ChecklistTemplate)
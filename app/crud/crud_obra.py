@@ -1,8 +1,14 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+from sqlalchemy import delete, exists, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 from app.crud.base import CRUDBase
-from app.models.models import Obra, ObraEngineer, User
+from app.crud.crud_tombstone import crud_sync_tombstone
+from app.models.models import Obra, ObraEngineer, User, ChecklistTemplate
 from app.schemas.schemas import ObraCreate, ObraUpdate
+from app.services.dashboard_cache import dashboard_cache
+from app.services.template_cache import template_cache
 
 
 class CRUDObra(CRUDBase[Obra, ObraCreate, ObraUpdate]):
@@ -15,9 +21,54 @@ class CRUDObra(CRUDBase[Obra, ObraCreate, ObraUpdate]):
         )
         db.add(db_obj)
         db.commit()
+        dashboard_cache.bump(gestor_id)
         db.refresh(db_obj)
         return db_obj
 
+    def update(self, db: Session, *, db_obj: Obra, obj_in: Union[ObraUpdate, Dict[str, Any]]) -> Obra:
+        was_active = bool(db_obj.is_active)
+        self._apply_update(db_obj, obj_in)
+        if was_active and not db_obj.is_active:
+            # Obra desativada some do app dos engenheiros no próximo sync incremental
+            crud_sync_tombstone.record_for_obra(db, obra_id=db_obj.id, entity="obra", entity_id=db_obj.id)
+        elif db_obj.is_active and not was_active:
+            # Reativada: os templates voltam no sync (o app os descartou junto com a obra)
+            db.execute(
+                update(ChecklistTemplate)
+                .where(ChecklistTemplate.obra_id == db_obj.id)
+                .values(updated_at=func.now())
+            )
+        db.add(db_obj)
+        db.commit()
+        dashboard_cache.bump(db_obj.gestor_id)  # ex.: obra desativada
+        db.refresh(db_obj)
+        return db_obj
+
+    def remove(self, db: Session, *, id: int) -> Obra:
+        """Remove a obra com atribuições e templates (IntegrityError se já tiver check-ins ou submissões)"""
+        obra = db.get(Obra, id)
+        crud_sync_tombstone.record_for_obra(db, obra_id=id, entity="obra", entity_id=id)
+        db.execute(delete(ObraEngineer).where(ObraEngineer.obra_id == id))
+        for template in obra.checklist_templates:
+            db.delete(template)  # Items removidos em cascata
+        db.delete(obra)
+        db.commit()
+        dashboard_cache.bump(obra.gestor_id)
+        template_cache.bump(id)
+        return obra
+
+    def get_with_details(self, db: Session, *, id: int) -> Optional[Obra]:
+        """Obra com engenheiros e templates (com items) carregados antecipadamente"""
+        return (
+            db.query(Obra)
+            .options(
+                selectinload(Obra.engineers).joinedload(ObraEngineer.engineer),
+                selectinload(Obra.checklist_templates).selectinload(ChecklistTemplate.items),
+            )
+            .filter(Obra.id == id)
+            .first()
+        )
+
     def get_by_gestor(
         self, db: Session, *, gestor_id: int, skip: int = 0, limit: int = 100
     ) -> List[Obra]:
@@ -41,6 +92,20 @@ class CRUDObra(CRUDBase[Obra, ObraCreate, ObraUpdate]):
             .all()
         )
 
+    def _engineer_access_query(self, *, obra_id: int, engineer_id: int):
+        return select(
+            exists().where(
+                ObraEngineer.engineer_id == engineer_id,
+                ObraEngineer.obra_id == obra_id,
+            )
+        )
+
+    def engineer_has_access(
+        self, db: Session, *, obra_id: int, engineer_id: int
+    ) -> bool:
+        """Verifica se o engenheiro está atribuído à obra"""
+        return bool(db.scalar(self._engineer_access_query(obra_id=obra_id, engineer_id=engineer_id)))
+
     def add_engineer(
         self, db: Session, *, obra_id: int, engineer_id: int
     ) -> ObraEngineer:
@@ -75,6 +140,8 @@ class CRUDObra(CRUDBase[Obra, ObraCreate, ObraUpdate]):
         )
         if obj:
             db.delete(obj)
+            # A obra some do app do engenheiro no próximo sync incremental
+            crud_sync_tombstone.record(db, engineer_id=engineer_id, entity="obra", entity_id=obra_id)
             db.commit()
             return True
         return False
@@ -87,5 +154,65 @@ class CRUDObra(CRUDBase[Obra, ObraCreate, ObraUpdate]):
             .all()
         )
 
+    # Variantes assíncronas
+
+    async def engineer_has_access_async(
+        self, db: AsyncSession, *, obra_id: int, engineer_id: int
+    ) -> bool:
+        """Verifica se o engenheiro está atribuído à obra"""
+        return bool(await db.scalar(self._engineer_access_query(obra_id=obra_id, engineer_id=engineer_id)))
+
+    async def get_accessible_obra_ids_async(
+        self, db: AsyncSession, *, engineer_id: int, obra_ids: Iterable[int]
+    ) -> Set[int]:
+        """Das obras informadas, as atribuídas ao engenheiro (autorização de um lote em uma query)"""
+        result = await db.scalars(
+            select(ObraEngineer.obra_id).filter(
+                ObraEngineer.engineer_id == engineer_id,
+                ObraEngineer.obra_id.in_(set(obra_ids)),
+            )
+        )
+        return set(result.all())
+
+    async def get_changed_for_engineer_async(
+        self, db: AsyncSession, *, engineer_id: int, since: Optional[datetime] = None
+    ) -> List[Obra]:
+        """Obras ativas do engenheiro alteradas (ou atribuídas a ele) após o watermark; todas se since=None"""
+        query = (
+            select(Obra)
+            .join(ObraEngineer)
+            .filter(ObraEngineer.engineer_id == engineer_id, Obra.is_active == True)
+        )
+        if since is not None:
+            query = query.filter(or_(
+                func.coalesce(Obra.updated_at, Obra.created_at) > since,
+                ObraEngineer.created_at > since,
+            ))
+        result = await db.execute(query.order_by(Obra.id))
+        return list(result.scalars().all())
+
+    async def get_by_gestor_async(
+        self, db: AsyncSession, *, gestor_id: int, skip: int = 0, limit: int = 100
+    ) -> List[Obra]:
+        result = await db.execute(
+            select(Obra)
+            .filter(Obra.gestor_id == gestor_id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_by_engineer_async(
+        self, db: AsyncSession, *, engineer_id: int, skip: int = 0, limit: int = 100
+    ) -> List[Obra]:
+        result = await db.execute(
+            select(Obra)
+            .join(ObraEngineer)
+            .filter(ObraEngineer.engineer_id == engineer_id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
 
 crud_obra = CRUDObra(Obra)
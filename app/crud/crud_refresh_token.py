@@ -0,0 +1,71 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.models import RefreshToken
+
+
+class CRUDRefreshToken:
+    """Refresh tokens emitidos; uso único e revogações valem para todos os workers"""
+
+    async def create_async(
+        self, db: AsyncSession, *, jti: str, user_id: int, family: str, expires_at: datetime
+    ) -> None:
+        # Emissão também limpa os tokens vencidos do usuário (a tabela não cresce sem limite)
+        await db.execute(
+            delete(RefreshToken).where(
+                RefreshToken.user_id == user_id, RefreshToken.expires_at < func.now()
+            )
+        )
+        db.add(RefreshToken(jti=jti, user_id=user_id, family=family, expires_at=expires_at))
+        await db.commit()
+
+    async def claim_async(self, db: AsyncSession, *, jti: str) -> Optional[str]:
+        """Marca o token como usado e retorna sua família (sem commit: grava junto com o novo token).
+
+        None se vencido, revogado ou já usado; o reuso de um token já trocado revoga a família.
+        """
+        # UPDATE condicional: de duas trocas concorrentes do mesmo token, só uma encontra used_at nulo
+        family = await db.scalar(
+            update(RefreshToken)
+            .where(
+                RefreshToken.jti == jti,
+                RefreshToken.used_at.is_(None),
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at > func.now(),
+            )
+            .values(used_at=func.now())
+            .returning(RefreshToken.family)
+            .execution_options(synchronize_session=False)
+        )
+        if family is None:
+            reused_family = await db.scalar(
+                select(RefreshToken.family).where(
+                    RefreshToken.jti == jti, RefreshToken.used_at.is_not(None)
+                )
+            )
+            if reused_family is not None:
+                await self.revoke_family_async(db, family=reused_family)
+        return family
+
+    async def revoke_family_async(self, db: AsyncSession, *, family: str) -> None:
+        """Revoga todos os tokens gerados a partir do mesmo login"""
+        await db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family == family, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+        )
+        await db.commit()
+
+    def revoke_user(self, db: Session, *, user_id: int) -> None:
+        """Revoga os refresh tokens do usuário (troca de senha, papel ou desativação)"""
+        db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+        )
+        db.commit()
+
+
+crud_refresh_token = CRUDRefreshToken()
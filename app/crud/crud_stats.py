@@ -0,0 +1,188 @@
+from datetime import date
+from typing import Dict, Iterable, Optional, Set
+from sqlalchemy import Date, Integer, column, delete, func, literal, select, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.models import (
+    ObraDailyStats,
+    Obra,
+    CheckIn,
+    ChecklistTemplate,
+    ChecklistSubmission,
+    ChecklistItemResponse,
+    ChecklistStatus,
+)
+
+COUNTERS = ("checkins", "submissions", "conforme", "nao_conforme", "pendente", "nao_aplicavel")
+STATUS_COUNTERS = ("conforme", "nao_conforme", "pendente", "nao_aplicavel")
+
+
+def status_counts(statuses: Iterable) -> Dict[str, int]:
+    """Conta as respostas por status (chaves = valores do enum)"""
+    counts = {key: 0 for key in STATUS_COUNTERS}
+    for status in statuses:
+        key = status.value if hasattr(status, "value") else str(status)
+        counts[key] += 1
+    return counts
+
+
+class CRUDObraDailyStats:
+    """Rollup diário por obra, incrementado na mesma transação da escrita"""
+
+    def _upsert(self, source, *, day: Optional[date], counters: Dict[str, int]):
+        """INSERT ... SELECT gestor/obra ... ON CONFLICT (obra_id, day) DO UPDATE somando"""
+        # Dia padrão no relógio do banco, o mesmo dos server_default dos registros
+        day_expr = literal(day, Date) if day is not None else func.current_date()
+        counter_values = [literal(counters.get(name, 0), Integer) for name in COUNTERS]
+        stmt = pg_insert(ObraDailyStats).from_select(
+            ["gestor_id", "obra_id", "day", *COUNTERS],
+            source.with_only_columns(Obra.gestor_id, Obra.id, day_expr, *counter_values),
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=["obra_id", "day"],
+            set_={
+                name: getattr(ObraDailyStats, name) + getattr(stmt.excluded, name)
+                for name in COUNTERS
+                if counters.get(name)
+            },
+        ).returning(ObraDailyStats.gestor_id)
+
+    def _checkin_stmt(self, *, obra_id: int, day: Optional[date]):
+        source = select(Obra.id).filter(Obra.id == obra_id)
+        return self._upsert(source, day=day, counters={"checkins": 1})
+
+    def _submission_stmt(self, *, template_id: int, statuses: Iterable, day: Optional[date]):
+        source = (
+            select(Obra.id)
+            .select_from(ChecklistTemplate)
+            .join(Obra, ChecklistTemplate.obra_id == Obra.id)
+            .filter(ChecklistTemplate.id == template_id)
+        )
+        counters = {"submissions": 1, **status_counts(statuses)}
+        return self._upsert(source, day=day, counters=counters)
+
+    # Escritas retornam o gestor da obra (para invalidar o cache do dashboard dele)
+
+    def record_checkin(self, db: Session, *, obra_id: int, day: Optional[date] = None) -> Optional[int]:
+        return db.scalar(self._checkin_stmt(obra_id=obra_id, day=day))
+
+    def record_submission(
+        self, db: Session, *, template_id: int, statuses: Iterable, day: Optional[date] = None
+    ) -> Optional[int]:
+        return db.scalar(self._submission_stmt(template_id=template_id, statuses=statuses, day=day))
+
+    async def record_checkin_async(
+        self, db: AsyncSession, *, obra_id: int, day: Optional[date] = None
+    ) -> Optional[int]:
+        return await db.scalar(self._checkin_stmt(obra_id=obra_id, day=day))
+
+    async def record_submission_async(
+        self, db: AsyncSession, *, template_id: int, statuses: Iterable, day: Optional[date] = None
+    ) -> Optional[int]:
+        return await db.scalar(self._submission_stmt(template_id=template_id, statuses=statuses, day=day))
+
+    async def record_many_async(self, db: AsyncSession, *, counters: Dict[int, Dict[str, int]]) -> Set[int]:
+        """Soma os contadores de várias obras (obra_id -> contadores) em um único upsert"""
+        if not counters:
+            return set()
+        batch = values(
+            column("obra_id", Integer), *[column(name, Integer) for name in COUNTERS], name="batch"
+        ).data([
+            (obra_id, *[obra_counters.get(name, 0) for name in COUNTERS])
+            for obra_id, obra_counters in counters.items()
+        ])
+        stmt = pg_insert(ObraDailyStats).from_select(
+            ["gestor_id", "obra_id", "day", *COUNTERS],
+            select(Obra.gestor_id, Obra.id, func.current_date(), *[batch.c[name] for name in COUNTERS])
+            .select_from(batch)
+            .join(Obra, Obra.id == batch.c.obra_id),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["obra_id", "day"],
+            set_={name: getattr(ObraDailyStats, name) + getattr(stmt.excluded, name) for name in COUNTERS},
+        ).returning(ObraDailyStats.gestor_id)
+        return set((await db.scalars(stmt)).all())
+
+    def rebuild(self, db: Session) -> None:
+        """Recalcula todo o rollup a partir das tabelas de origem"""
+        db.execute(delete(ObraDailyStats))
+
+        checkin_day = func.date(CheckIn.checkin_time)
+        checkins = (
+            select(Obra.id)
+            .select_from(CheckIn)
+            .join(Obra, CheckIn.obra_id == Obra.id)
+            .group_by(Obra.gestor_id, Obra.id, checkin_day)
+        )
+        self._rebuild_upsert(db, checkins, checkin_day, {"checkins": func.count(CheckIn.id)})
+
+        submission_day = func.date(ChecklistSubmission.submitted_at)
+        submissions = (
+            select(Obra.id)
+            .select_from(ChecklistSubmission)
+            .join(ChecklistTemplate, ChecklistSubmission.template_id == ChecklistTemplate.id)
+            .join(Obra, ChecklistTemplate.obra_id == Obra.id)
+            .group_by(Obra.gestor_id, Obra.id, submission_day)
+        )
+        self._rebuild_upsert(db, submissions, submission_day, {"submissions": func.count(ChecklistSubmission.id)})
+
+        responses = submissions.join(
+            ChecklistItemResponse, ChecklistItemResponse.submission_id == ChecklistSubmission.id
+        )
+        self._rebuild_upsert(db, responses, submission_day, {
+            name: func.count(ChecklistItemResponse.id).filter(
+                ChecklistItemResponse.status == ChecklistStatus(name)
+            )
+            for name in STATUS_COUNTERS
+        })
+        db.commit()
+
+    def _rebuild_upsert(self, db: Session, source, day_expr, aggregates: dict) -> None:
+        counter_values = [aggregates.get(name, literal(0, Integer)) for name in COUNTERS]
+        stmt = pg_insert(ObraDailyStats).from_select(
+            ["gestor_id", "obra_id", "day", *COUNTERS],
+            source.with_only_columns(Obra.gestor_id, Obra.id, day_expr, *counter_values),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["obra_id", "day"],
+            set_={name: getattr(ObraDailyStats, name) + getattr(stmt.excluded, name) for name in aggregates},
+        )
+        db.execute(stmt)
+
+    # Leituras para o dashboard
+
+    def totals_query(
+        self,
+        *,
+        gestor_id: Optional[int] = None,
+        obra_id: Optional[int] = None,
+        since=None,
+    ):
+        """SELECT com a soma de cada contador (uma linha, mesmo sem dados)"""
+        query = select(*[
+            func.coalesce(func.sum(getattr(ObraDailyStats, name)), 0).label(name)
+            for name in COUNTERS
+        ])
+        if gestor_id is not None:
+            query = query.filter(ObraDailyStats.gestor_id == gestor_id)
+        if obra_id is not None:
+            query = query.filter(ObraDailyStats.obra_id == obra_id)
+        if since is not None:
+            query = query.filter(ObraDailyStats.day >= since)
+        return query
+
+    async def get_totals_async(
+        self,
+        db: AsyncSession,
+        *,
+        gestor_id: Optional[int] = None,
+        obra_id: Optional[int] = None,
+        since: Optional[date] = None,
+    ) -> Dict[str, int]:
+        """Soma todos os contadores (filtrando por gestor, obra e/ou data inicial)"""
+        result = await db.execute(self.totals_query(gestor_id=gestor_id, obra_id=obra_id, since=since))
+        return {name: int(value) for name, value in result.one()._mapping.items()}
+
+
+crud_obra_daily_stats = CRUDObraDailyStats()
@@ -1,11 +1,31 @@
-from typing import List
-from sqlalchemy.orm import Session
-from app.crud.base import CRUDBase
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from app.crud.base import CRUDBase, violated_constraint
+from app.utils.pagination import keyset_page
+from app.crud.crud_stats import crud_obra_daily_stats
+from app.crud.crud_activity import crud_activity_event
 from app.models.models import ChecklistSubmission, ChecklistItemResponse
 from app.schemas.schemas import ChecklistSubmissionCreate, ChecklistSubmissionResponse
+from app.services.dashboard_cache import dashboard_cache
+from app.services.idempotency import idempotency_store
+
+# Índice único (engineer_id, idempotency_key) da migração 0004
+IDEMPOTENCY_INDEX = "ux_checklist_submissions_engineer_idempotency"
 
 
 class CRUDChecklistSubmission(CRUDBase[ChecklistSubmission, ChecklistSubmissionCreate, ChecklistSubmissionResponse]):
+    def _response_rows(self, obj_in: ChecklistSubmissionCreate, *, submission_id: int) -> List[dict]:
+        return [
+            {**response_data.dict(), "submission_id": submission_id}
+            for response_data in obj_in.responses
+        ]
+
     def create_submission(
         self, db: Session, *, obj_in: ChecklistSubmissionCreate, engineer_id: int
     ) -> ChecklistSubmission:
@@ -17,55 +37,251 @@ class CRUDChecklistSubmission(CRUDBase[ChecklistSubmission, ChecklistSubmissionC
         db.add(db_obj)
         db.flush()  # Para obter o ID antes do commit
         
-        # Criar as respostas dos items
-        for response_data in obj_in.responses:
-            db_response = ChecklistItemResponse(
-                **response_data.dict(),
-                submission_id=db_obj.id
-            )
-            db.add(db_response)
-        
+        # Criar as respostas dos items (um único INSERT multi-linha)
+        rows = self._response_rows(obj_in, submission_id=db_obj.id)
+        if rows:
+            db.execute(insert(ChecklistItemResponse), rows)
+
+        # Rollup diário e feed de atividades na mesma transação
+        gestor_id = crud_obra_daily_stats.record_submission(
+            db,
+            template_id=obj_in.template_id,
+            statuses=[r.status for r in obj_in.responses],
+        )
+        crud_activity_event.record_submission(
+            db, template_id=obj_in.template_id, user_id=engineer_id, ref_id=db_obj.id
+        )
         db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        dashboard_cache.bump(gestor_id)
+        return self.get_with_responses(db, id=db_obj.id)
+
+    def get_with_responses(self, db: Session, *, id: int) -> Optional[ChecklistSubmission]:
+        return (
+            db.query(ChecklistSubmission)
+            .options(selectinload(ChecklistSubmission.responses))
+            .filter(ChecklistSubmission.id == id)
+            .populate_existing()
+            .first()
+        )
 
     def get_by_engineer(
-        self, db: Session, *, engineer_id: int, skip: int = 0, limit: int = 100
+        self, db: Session, *, engineer_id: int, skip: int = 0, limit: int = 100,
+        before: Optional[Tuple[datetime, int]] = None
     ) -> List[ChecklistSubmission]:
-        return (
+        query = (
             db.query(ChecklistSubmission)
+            .options(selectinload(ChecklistSubmission.responses))
             .filter(ChecklistSubmission.engineer_id == engineer_id)
-            .order_by(ChecklistSubmission.submitted_at.desc())
+        )
+        return (
+            keyset_page(query, ChecklistSubmission.submitted_at, ChecklistSubmission.id, before)
             .offset(skip)
             .limit(limit)
             .all()
         )
 
     def get_by_template(
-        self, db: Session, *, template_id: int, skip: int = 0, limit: int = 100
+        self, db: Session, *, template_id: int, skip: int = 0, limit: int = 100,
+        before: Optional[Tuple[datetime, int]] = None
     ) -> List[ChecklistSubmission]:
-        return (
+        query = (
             db.query(ChecklistSubmission)
+            .options(selectinload(ChecklistSubmission.responses))
             .filter(ChecklistSubmission.template_id == template_id)
-            .order_by(ChecklistSubmission.submitted_at.desc())
+        )
+        return (
+            keyset_page(query, ChecklistSubmission.submitted_at, ChecklistSubmission.id, before)
             .offset(skip)
             .limit(limit)
             .all()
         )
 
     def get_by_obra(
-        self, db: Session, *, obra_id: int, skip: int = 0, limit: int = 100
+        self, db: Session, *, obra_id: int, skip: int = 0, limit: int = 100,
+        before: Optional[Tuple[datetime, int]] = None
     ) -> List[ChecklistSubmission]:
         from app.models.models import ChecklistTemplate
-        return (
+        query = (
             db.query(ChecklistSubmission)
             .join(ChecklistTemplate)
+            .options(selectinload(ChecklistSubmission.responses))
             .filter(ChecklistTemplate.obra_id == obra_id)
-            .order_by(ChecklistSubmission.submitted_at.desc())
+        )
+        return (
+            keyset_page(query, ChecklistSubmission.submitted_at, ChecklistSubmission.id, before)
             .offset(skip)
             .limit(limit)
             .all()
         )
 
+    # Variantes assíncronas (respostas carregadas antecipadamente: sem lazy load em async)
+
+    async def create_submission_async(
+        self, db: AsyncSession, *, obj_in: ChecklistSubmissionCreate, engineer_id: int,
+        idempotency_key: Optional[str] = None
+    ) -> ChecklistSubmission:
+        db_obj = ChecklistSubmission(
+            template_id=obj_in.template_id,
+            engineer_id=engineer_id,
+            idempotency_key=idempotency_key,
+            request_fingerprint=idempotency_store.fingerprint(obj_in) if idempotency_key else None,
+        )
+        db.add(db_obj)
+        try:
+            await db.flush()  # Para obter o ID antes do commit
+        except IntegrityError as e:
+            # Só a chave repetida é retry concorrente; FK/outras violações sobem como erro
+            if idempotency_key is None or violated_constraint(e) != IDEMPOTENCY_INDEX:
+                raise
+            # Retry concorrente com a mesma chave já gravou a submissão
+            await db.rollback()
+            existing = await self.get_by_idempotency_key_async(
+                db, engineer_id=engineer_id, idempotency_key=idempotency_key
+            )
+            if existing is None:
+                raise
+            return existing
+
+        # Um único INSERT ... RETURNING: respostas já prontas para a resposta da API
+        rows = self._response_rows(obj_in, submission_id=db_obj.id)
+        responses = []
+        if rows:
+            result = await db.scalars(insert(ChecklistItemResponse).returning(ChecklistItemResponse), rows)
+            responses = list(result.all())
+        set_committed_value(db_obj, "responses", responses)
+
+        gestor_id = await crud_obra_daily_stats.record_submission_async(
+            db,
+            template_id=obj_in.template_id,
+            statuses=[r.status for r in obj_in.responses],
+        )
+        await crud_activity_event.record_submission_async(
+            db, template_id=obj_in.template_id, user_id=engineer_id, ref_id=db_obj.id
+        )
+        await db.commit()
+        await dashboard_cache.bump_async(gestor_id)
+        return db_obj
+
+    async def get_by_idempotency_key_async(
+        self, db: AsyncSession, *, engineer_id: int, idempotency_key: str
+    ) -> Optional[ChecklistSubmission]:
+        result = await db.execute(
+            select(ChecklistSubmission)
+            .options(selectinload(ChecklistSubmission.responses))
+            .filter(
+                ChecklistSubmission.engineer_id == engineer_id,
+                ChecklistSubmission.idempotency_key == idempotency_key,
+            )
+        )
+        return result.scalars().first()
+
+    async def create_many_async(
+        self, db: AsyncSession, *, objs_in: Dict[str, ChecklistSubmissionCreate], engineer_id: int
+    ) -> Dict[str, int]:
+        """Insere várias submissões (chave -> dados) e todas as respostas em dois INSERTs, sem commit.
+
+        Chaves já existentes são ignoradas (ON CONFLICT); retorna chave -> id das criadas.
+        """
+        if not objs_in:
+            return {}
+        stmt = (
+            pg_insert(ChecklistSubmission)
+            .values([
+                {"template_id": obj_in.template_id, "engineer_id": engineer_id, "idempotency_key": key,
+                 "request_fingerprint": idempotency_store.fingerprint(obj_in)}
+                for key, obj_in in objs_in.items()
+            ])
+            .on_conflict_do_nothing(
+                index_elements=["engineer_id", "idempotency_key"],
+                index_where=ChecklistSubmission.idempotency_key.isnot(None),
+            )
+            .returning(ChecklistSubmission.idempotency_key, ChecklistSubmission.id)
+        )
+        created = dict((await db.execute(stmt)).all())
+
+        rows = [
+            row
+            for key, submission_id in created.items()
+            for row in self._response_rows(objs_in[key], submission_id=submission_id)
+        ]
+        if rows:
+            await db.execute(insert(ChecklistItemResponse), rows)
+        return created
+
+    async def get_ids_by_keys_async(
+        self, db: AsyncSession, *, engineer_id: int, keys: List[str]
+    ) -> Dict[str, int]:
+        """Submissões já registradas com as chaves de idempotência informadas"""
+        if not keys:
+            return {}
+        result = await db.execute(
+            select(ChecklistSubmission.idempotency_key, ChecklistSubmission.id).filter(
+                ChecklistSubmission.engineer_id == engineer_id,
+                ChecklistSubmission.idempotency_key.in_(keys),
+            )
+        )
+        return dict(result.all())
+
+    async def get_with_responses_async(
+        self, db: AsyncSession, *, id: int
+    ) -> Optional[ChecklistSubmission]:
+        result = await db.execute(
+            select(ChecklistSubmission)
+            .options(selectinload(ChecklistSubmission.responses))
+            .filter(ChecklistSubmission.id == id)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalars().first()
+
+    async def get_by_engineer_async(
+        self, db: AsyncSession, *, engineer_id: int, skip: int = 0, limit: int = 100,
+        before: Optional[Tuple[datetime, int]] = None
+    ) -> List[ChecklistSubmission]:
+        query = (
+            select(ChecklistSubmission)
+            .options(selectinload(ChecklistSubmission.responses))
+            .filter(ChecklistSubmission.engineer_id == engineer_id)
+        )
+        result = await db.execute(
+            keyset_page(query, ChecklistSubmission.submitted_at, ChecklistSubmission.id, before)
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_by_template_async(
+        self, db: AsyncSession, *, template_id: int, skip: int = 0, limit: int = 100,
+        before: Optional[Tuple[datetime, int]] = None
+    ) -> List[ChecklistSubmission]:
+        query = (
+            select(ChecklistSubmission)
+            .options(selectinload(ChecklistSubmission.responses))
+            .filter(ChecklistSubmission.template_id == template_id)
+        )
+        result = await db.execute(
+            keyset_page(query, ChecklistSubmission.submitted_at, ChecklistSubmission.id, before)
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_by_obra_async(
+        self, db: AsyncSession, *, obra_id: int, skip: int = 0, limit: int = 100,
+        before: Optional[Tuple[datetime, int]] = None
+    ) -> List[ChecklistSubmission]:
+        from app.models.models import ChecklistTemplate
+        query = (
+            select(ChecklistSubmission)
+            .join(ChecklistTemplate)
+            .options(selectinload(ChecklistSubmission.responses))
+            .filter(ChecklistTemplate.obra_id == obra_id)
+        )
+        result = await db.execute(
+            keyset_page(query, ChecklistSubmission.submitted_at, ChecklistSubmission.id, before)
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
 
 crud_checklist_submission = CRUDChecklistSubmission(ChecklistSubmission)
@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Dict, List
+from sqlalchemy import insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.models import ObraEngineer, SyncTombstone
+
+
+class CRUDSyncTombstone:
+    """Remoções registradas para o sync incremental do app (escritas na mesma transação)"""
+
+    def record(self, db: Session, *, engineer_id: int, entity: str, entity_id: int) -> None:
+        db.add(SyncTombstone(engineer_id=engineer_id, entity=entity, entity_id=entity_id))
+
+    def record_for_obra(self, db: Session, *, obra_id: int, entity: str, entity_id: int) -> None:
+        """Registra a remoção para todos os engenheiros atribuídos à obra (um único INSERT ... SELECT)"""
+        db.execute(
+            insert(SyncTombstone).from_select(
+                ["engineer_id", "entity", "entity_id"],
+                select(ObraEngineer.engineer_id, literal(entity), literal(entity_id))
+                .where(ObraEngineer.obra_id == obra_id),
+            )
+        )
+
+    async def get_deleted_since_async(
+        self, db: AsyncSession, *, engineer_id: int, since: datetime
+    ) -> Dict[str, List[int]]:
+        """entity -> IDs removidos para o engenheiro após o watermark"""
+        result = await db.execute(
+            select(SyncTombstone.entity, SyncTombstone.entity_id)
+            .filter(
+                SyncTombstone.engineer_id == engineer_id,
+                SyncTombstone.deleted_at > since,
+            )
+            .order_by(SyncTombstone.deleted_at)
+        )
+        deleted: Dict[str, List[int]] = {}
+        for entity, entity_id in result.all():
+            deleted.setdefault(entity, []).append(entity_id)
+        return deleted
+
+
+crud_sync_tombstone = CRUDSyncTombstone()
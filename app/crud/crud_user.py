@@ -1,9 +1,14 @@
 from typing import Optional, List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.crud.base import CRUDBase
 from app.models.models import User, UserRole
 from app.schemas.schemas import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.crud.crud_refresh_token import crud_refresh_token
+from app.services.password_hasher import password_hasher
+from app.services.token_service import token_service
+from app.services.user_cache import user_cache
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
@@ -13,7 +18,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def create(self, db: Session, *, obj_in: UserCreate) -> User:
         db_obj = User(
             email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=password_hasher.hash(obj_in.password),
             full_name=obj_in.full_name,
             role=obj_in.role,
         )
@@ -25,16 +30,28 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def update(self, db: Session, *, db_obj: User, obj_in: UserUpdate) -> User:
         update_data = obj_in.dict(exclude_unset=True)
         if "password" in update_data:
-            hashed_password = get_password_hash(update_data["password"])
+            hashed_password = password_hasher.hash(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        user = super().update(db, db_obj=db_obj, obj_in=update_data)
+        user_cache.invalidate(user.id)
+        # Claims dos tokens emitidos (papel/ativo) ou a senha mudaram: exige novo token
+        if update_data.keys() & {"role", "is_active", "hashed_password"}:
+            crud_refresh_token.revoke_user(db, user_id=user.id)
+            token_service.revoke_user(user.id)
+        return user
+
+    def remove(self, db: Session, *, id: int) -> User:
+        user = super().remove(db, id=id)
+        user_cache.invalidate(id)
+        token_service.revoke_user(id)
+        return user
 
     def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
         user = self.get_by_email(db, email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        if not password_hasher.verify(password, user.hashed_password):
             return None
         return user
 
@@ -47,5 +64,45 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def get_gestores(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[User]:
         return db.query(User).filter(User.role == UserRole.GESTOR).offset(skip).limit(limit).all()
 
+    # Variantes assíncronas
+
+    async def get_by_email_async(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        result = await db.execute(select(User).filter(User.email == email))
+        return result.scalars().first()
+
+    async def create_async(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
+        db_obj = User(
+            email=obj_in.email,
+            hashed_password=await password_hasher.hash_async(obj_in.password),
+            full_name=obj_in.full_name,
+            role=obj_in.role,
+        )
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def authenticate_async(
+        self, db: AsyncSession, *, email: str, password: str
+    ) -> Optional[User]:
+        user = await self.get_by_email_async(db, email=email)
+        if not user:
+            return None
+        if not await password_hasher.verify_async(password, user.hashed_password):
+            return None
+        if password_hasher.needs_rehash(user.hashed_password):
+            # BCRYPT_ROUNDS mudou: refaz o hash com a senha em claro, disponível só aqui
+            user.hashed_password = await password_hasher.hash_async(password)
+            await db.commit()
+        return user
+
+    async def get_engineers_async(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ) -> List[User]:
+        result = await db.execute(
+            select(User).filter(User.role == UserRole.ENGENHEIRO).offset(skip).limit(limit)
+        )
+        return list(result.scalars().all())
+
 
 crud_user = CRUDUser(User)
@@ -1,13 +1,76 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import AsyncIterator, Tuple
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from app.core.config import settings
 
+
+class _TimedPoolMixin:
+    """Mede o tempo de espera por uma conexão livre no pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._wait_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._wait_lock:
+                self.wait_count += 1
+                self.wait_total += elapsed
+                self.wait_max = max(self.wait_max, elapsed)
+
+    def recreate(self):
+        # Preserva as métricas quando o engine recria o pool (ex.: após dispose)
+        new_pool = super().recreate()
+        new_pool.wait_count = self.wait_count
+        new_pool.wait_total = self.wait_total
+        new_pool.wait_max = self.wait_max
+        new_pool.timeouts = self.timeouts
+        return new_pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """QueuePool com métricas de espera (engine síncrono)"""
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool com métricas de espera (engine assíncrono)"""
+
+
+def _pool_options(poolclass) -> dict:
+    """Opções de pool de acordo com DB_POOL_MODE"""
+    if settings.DB_POOL_MODE == "null":
+        # Sem pool: uma conexão nova por sessão
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+
 # Configuração do engine com pool otimizado para serverless databases
 engine = create_engine(
     settings.DATABASE_URL,
-    poolclass=NullPool,  # Desabilita pool de conexões para evitar SSL timeouts
     connect_args={
         "connect_timeout": 10,
         "keepalives": 1,
@@ -15,15 +78,101 @@ engine = create_engine(
         "keepalives_interval": 10,
         "keepalives_count": 5,
     },
-    pool_pre_ping=True,  # Testa conexão antes de usar
-    echo=False  # Desabilita logs SQL em produção
+    pool_pre_ping=settings.DB_POOL_PRE_PING,  # Testa conexão antes de usar
+    echo=False,  # Desabilita logs SQL em produção
+    **_pool_options(TimedQueuePool)
+)
+
+
+def _async_database_url() -> Tuple[URL, dict]:
+    """Converte DATABASE_URL (psycopg2) para o driver asyncpg"""
+    url = make_url(settings.DATABASE_URL)
+    query = dict(url.query)
+    connect_args = {}
+    # asyncpg não entende os parâmetros libpq sslmode/connect_timeout
+    sslmode = query.pop("sslmode", None)
+    if sslmode and sslmode not in ("disable", "allow", "prefer"):
+        connect_args["ssl"] = sslmode
+    connect_timeout = query.pop("connect_timeout", None)
+    connect_args["timeout"] = int(connect_timeout) if connect_timeout else 10
+    url = url.set(drivername="postgresql+asyncpg", query=query)
+    return url, connect_args
+
+
+_async_url, _async_connect_args = _async_database_url()
+
+# Engine assíncrono (asyncpg) para as rotas async
+async_engine = create_async_engine(
+    _async_url,
+    connect_args=_async_connect_args,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    echo=False,
+    **_pool_options(TimedAsyncQueuePool)
 )
 
+
+def _on_checkin(dbapi_connection, connection_record):
+    """Registra quando a conexão voltou ao pool"""
+    connection_record.info["returned_at"] = time.monotonic()
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    """Descarta conexões que ficaram ociosas além do limite"""
+    returned_at = connection_record.info.pop("returned_at", None)
+    idle_timeout = settings.DB_POOL_IDLE_TIMEOUT
+    if returned_at is not None and idle_timeout > 0:
+        if time.monotonic() - returned_at > idle_timeout:
+            # O pool descarta esta conexão e tenta novamente com uma nova
+            raise exc.DisconnectionError("Idle connection reaped")
+
+
+for _engine in (engine, async_engine.sync_engine):
+    event.listen(_engine, "checkin", _on_checkin)
+    event.listen(_engine, "checkout", _on_checkout)
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
+def _pool_metrics(pool) -> dict:
+    """Métricas de um pool de conexões"""
+    if not isinstance(pool, QueuePool):
+        return {}
+
+    metrics = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+    }
+    if isinstance(pool, _TimedPoolMixin):
+        with pool._wait_lock:
+            wait_count = pool.wait_count
+            metrics.update({
+                "wait_count": wait_count,
+                "wait_avg_ms": round(pool.wait_total / wait_count * 1000, 3) if wait_count else 0.0,
+                "wait_max_ms": round(pool.wait_max * 1000, 3),
+                "timeouts": pool.timeouts,
+            })
+    return metrics
+
+
+def get_pool_status() -> dict:
+    """Métricas dos pools de conexões (síncrono e assíncrono)"""
+    return {
+        "mode": settings.DB_POOL_MODE,
+        "sync": _pool_metrics(engine.pool),
+        "async": _pool_metrics(async_engine.pool),
+    }
+
+
 def get_db():
     """Dependency para obter sessão do banco de dados"""
     db = SessionLocal()
@@ -31,3 +180,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency para obter sessão assíncrona do banco de dados"""
+    async with AsyncSessionLocal() as db:
+        yield db
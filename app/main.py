@@ -1,13 +1,33 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.api_router import api_router
+from app.core.cache import get_cache_backend
 from app.core.config import settings
-from app.database.database import engine, Base
+from app.database.database import engine, async_engine, get_pool_status
+from app.services.auth_service import auth_service
+from app.services.file_service import file_service
+from app.services.password_hasher import password_hasher
+from app.utils.query_counter import install_query_counter, query_budget_middleware
+from app.utils.rate_limit import rate_limit_middleware
+
+# Esquema do banco gerenciado pelo Alembic: `alembic upgrade head` antes de subir a API
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Invalidações de cache vindas dos outros workers
+    get_cache_backend().start()
+    yield
+    # Encerramento: liberar pool de processos e conexões
+    file_service.shutdown()
+    password_hasher.shutdown()
+    get_cache_backend().close()
+    await async_engine.dispose()
 
-# Criar tabelas
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     description="""
@@ -80,6 +100,11 @@ Endpoints específicos para aplicativo mobile dos engenheiros: `/api/v1/mobile/*
     ]
 )
 
+# Rate limiting antes das rotas (login/bcrypt, sessões de banco); registrado antes do CORS
+# para que o 429 saia com os cabeçalhos CORS
+if settings.RATE_LIMIT_ENABLED:
+    app.middleware("http")(rate_limit_middleware(settings.RATE_LIMITS))
+
 # Configurar CORS - Permite todas as origens em desenvolvimento
 app.add_middleware(
     CORSMiddleware,
@@ -91,6 +116,11 @@ app.add_middleware(
     max_age=3600,  # Cache preflight por 1 hora
 )
 
+# Opcional: orçamento global de queries por requisição (X-Query-Count; os orçamentos por rota ficam nos testes)
+if settings.QUERY_BUDGET > 0:
+    install_query_counter(engine, async_engine.sync_engine)
+    app.middleware("http")(query_budget_middleware(settings.QUERY_BUDGET, settings.QUERY_BUDGET_STRICT))
+
 # Incluir rotas
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -101,3 +131,13 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/health/db")
+def health_db():
+    """Métricas do pool de conexões com o banco"""
+    return {"status": "healthy", "pool": get_pool_status()}
+
+@app.get("/health/auth")
+def health_auth():
+    """Latência de login e métricas do pool de hashing de senhas"""
+    return {"status": "healthy", **auth_service.get_stats()}
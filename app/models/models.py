@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Text, Float, Index, LargeBinary, Enum as SQLEnum
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.database.database import Base
 import enum
 
@@ -42,6 +42,9 @@ class User(Base):
 class Obra(Base):
     """Modelo de obra"""
     __tablename__ = "obras"
+    __table_args__ = (
+        Index("ix_obras_gestor", "gestor_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(255), nullable=False)
@@ -64,6 +67,12 @@ class Obra(Base):
 class ObraEngineer(Base):
     """Tabela de associação entre obras e engenheiros"""
     __tablename__ = "obra_engineers"
+    __table_args__ = (
+        # Verificação de acesso do engenheiro à obra (um index probe)
+        Index("ix_obra_engineers_engineer_obra", "engineer_id", "obra_id", unique=True),
+        # Listagem dos engenheiros de uma obra
+        Index("ix_obra_engineers_obra", "obra_id", "engineer_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     obra_id = Column(Integer, ForeignKey("obras.id"), nullable=False)
@@ -78,6 +87,9 @@ class ObraEngineer(Base):
 class ChecklistTemplate(Base):
     """Template de checklist para uma obra"""
     __tablename__ = "checklist_templates"
+    __table_args__ = (
+        Index("ix_checklist_templates_obra", "obra_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     obra_id = Column(Integer, ForeignKey("obras.id"), nullable=False)
@@ -96,6 +108,9 @@ class ChecklistTemplate(Base):
 class ChecklistTemplateItem(Base):
     """Item do template de checklist"""
     __tablename__ = "checklist_template_items"
+    __table_args__ = (
+        Index("ix_checklist_template_items_template", "template_id", "ordem"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     template_id = Column(Integer, ForeignKey("checklist_templates.id"), nullable=False)
@@ -112,6 +127,16 @@ class ChecklistTemplateItem(Base):
 class CheckIn(Base):
     """Check-in do engenheiro na obra"""
     __tablename__ = "checkins"
+    __table_args__ = (
+        # Listagens paginadas por cursor (checkin_time, id)
+        Index("ix_checkins_engineer_time", "engineer_id", "checkin_time", "id"),
+        Index("ix_checkins_obra_time", "obra_id", "checkin_time", "id"),
+        # Deduplicação de reenvios do app (sync offline)
+        Index(
+            "ux_checkins_engineer_idempotency", "engineer_id", "idempotency_key",
+            unique=True, postgresql_where=text("idempotency_key IS NOT NULL"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     engineer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -119,6 +144,8 @@ class CheckIn(Base):
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     checkin_time = Column(DateTime(timezone=True), server_default=func.now())
+    idempotency_key = Column(String(64), nullable=True)  # Gerada pelo app
+    request_fingerprint = Column(LargeBinary(16), nullable=True)  # Digest do pedido gravado com a chave
     
     # Relacionamentos
     engineer = relationship("User", back_populates="checkins")
@@ -128,11 +155,23 @@ class CheckIn(Base):
 class ChecklistSubmission(Base):
     """Submissão de checklist pelo engenheiro"""
     __tablename__ = "checklist_submissions"
+    __table_args__ = (
+        # Listagens paginadas por cursor (submitted_at, id)
+        Index("ix_checklist_submissions_engineer_time", "engineer_id", "submitted_at", "id"),
+        Index("ix_checklist_submissions_template_time", "template_id", "submitted_at", "id"),
+        # Deduplicação de reenvios do app (sync offline)
+        Index(
+            "ux_checklist_submissions_engineer_idempotency", "engineer_id", "idempotency_key",
+            unique=True, postgresql_where=text("idempotency_key IS NOT NULL"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     template_id = Column(Integer, ForeignKey("checklist_templates.id"), nullable=False)
     engineer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     submitted_at = Column(DateTime(timezone=True), server_default=func.now())
+    idempotency_key = Column(String(64), nullable=True)  # Gerada pelo app
+    request_fingerprint = Column(LargeBinary(16), nullable=True)  # Digest do pedido gravado com a chave
     
     # Relacionamentos
     template = relationship("ChecklistTemplate", back_populates="submissions")
@@ -143,6 +182,9 @@ class ChecklistSubmission(Base):
 class ChecklistItemResponse(Base):
     """Resposta de cada item do checklist"""
     __tablename__ = "checklist_item_responses"
+    __table_args__ = (
+        Index("ix_checklist_item_responses_submission", "submission_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     submission_id = Column(Integer, ForeignKey("checklist_submissions.id"), nullable=False)
@@ -155,3 +197,78 @@ class ChecklistItemResponse(Base):
     # Relacionamentos
     submission = relationship("ChecklistSubmission", back_populates="responses")
     template_item = relationship("ChecklistTemplateItem", back_populates="responses")
+
+
+class ObraDailyStats(Base):
+    """Contadores diários por obra (rollup mantido na escrita para o dashboard)"""
+    __tablename__ = "obra_daily_stats"
+    __table_args__ = (
+        Index("ix_obra_daily_stats_obra_day", "obra_id", "day", unique=True),
+        Index("ix_obra_daily_stats_gestor_day", "gestor_id", "day"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    gestor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    obra_id = Column(Integer, ForeignKey("obras.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    checkins = Column(Integer, nullable=False, default=0)
+    submissions = Column(Integer, nullable=False, default=0)
+    conforme = Column(Integer, nullable=False, default=0)
+    nao_conforme = Column(Integer, nullable=False, default=0)
+    pendente = Column(Integer, nullable=False, default=0)
+    nao_aplicavel = Column(Integer, nullable=False, default=0)
+
+
+class ActivityEvent(Base):
+    """Feed de atividades do gestor (append-only, escrito junto com check-ins e checklists)"""
+    __tablename__ = "activity_events"
+    
+    id = Column(Integer, primary_key=True)
+    gestor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    obra_id = Column(Integer, ForeignKey("obras.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    tipo = Column(String(20), nullable=False)  # "checkin" ou "checklist"
+    ref_id = Column(Integer, nullable=False)  # id do check-in ou da submissão
+    obra_nome = Column(String, nullable=False)
+    usuario_nome = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+# Leitura do feed: faixa (gestor_id, created_at desc, id desc) com paginação por cursor
+Index(
+    "ix_activity_events_gestor_created",
+    ActivityEvent.gestor_id,
+    ActivityEvent.created_at.desc(),
+    ActivityEvent.id.desc(),
+)
+
+
+class SyncTombstone(Base):
+    """Remoções visíveis ao app no sync incremental (ex.: engenheiro desatribuído da obra)"""
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (
+        Index("ix_sync_tombstones_engineer_deleted", "engineer_id", "deleted_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    engineer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    entity = Column(String(20), nullable=False)  # "obra", "template" ou "template_item"
+    entity_id = Column(Integer, nullable=False)  # Sem FK: sobrevive à remoção do registro
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class RefreshToken(Base):
+    """Refresh tokens emitidos: uso único e revogação compartilhados por todos os workers"""
+    __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        Index("ix_refresh_tokens_family", "family"),
+        Index("ix_refresh_tokens_user", "user_id"),
+    )
+    
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    family = Column(String(32), nullable=False)  # Tokens gerados por rotação a partir do mesmo login
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    used_at = Column(DateTime(timezone=True), nullable=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
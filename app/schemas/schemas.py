@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, computed_field
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
+from app.utils.pagination import encode_cursor
 
 
 # Enums
@@ -48,6 +49,12 @@ class UserResponse(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # segundos de validade do access token
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -166,6 +173,12 @@ class CheckInResponse(BaseModel):
     latitude: float
     longitude: float
     checkin_time: datetime
+
+    @computed_field
+    @property
+    def cursor(self) -> str:
+        """Passar em ?cursor= para buscar os check-ins anteriores"""
+        return encode_cursor(self.checkin_time, self.id)
     
     class Config:
         from_attributes = True
@@ -199,11 +212,68 @@ class ChecklistSubmissionResponse(BaseModel):
     engineer_id: int
     submitted_at: datetime
     responses: List[ChecklistItemResponseResponse] = []
+
+    @computed_field
+    @property
+    def cursor(self) -> str:
+        """Passar em ?cursor= para buscar as submissões anteriores"""
+        return encode_cursor(self.submitted_at, self.id)
     
     class Config:
         from_attributes = True
 
 
+# Sync offline (lote de registros feitos sem sinal)
+class SyncCheckIn(CheckInCreate):
+    idempotency_key: str = Field(..., min_length=1, max_length=64)  # Gerada pelo app
+
+
+class SyncChecklistSubmission(ChecklistSubmissionCreate):
+    idempotency_key: str = Field(..., min_length=1, max_length=64)  # Gerada pelo app
+
+
+class MobileSyncRequest(BaseModel):
+    checkins: List[SyncCheckIn] = []
+    submissions: List[SyncChecklistSubmission] = []
+
+
+class SyncItemResult(BaseModel):
+    """Resultado de um item do lote, na mesma ordem do envio"""
+    idempotency_key: str
+    status: str  # "created", "duplicate" ou "error"
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class MobileSyncResponse(BaseModel):
+    checkins: List[SyncItemResult] = []
+    submissions: List[SyncItemResult] = []
+
+
+class MobileCatalogDelta(BaseModel):
+    """Obras e templates alterados após o watermark enviado pelo app"""
+    watermark: datetime  # Passar em ?since= na próxima sincronização
+    full: bool  # True: catálogo completo, substituir o cache local
+    obras: List[ObraResponse] = []
+    templates: List[ChecklistTemplateResponse] = []  # Sempre com todos os items do template
+    deleted_obras: List[int] = []  # Obras removidas, desativadas ou desatribuídas (descartar com seus templates)
+    deleted_templates: List[int] = []  # Templates removidos ou desativados
+    deleted_template_items: List[int] = []  # Items removidos (o template alterado também vem em templates)
+
+
+# Upload Schemas
+class PhotoPresignRequest(BaseModel):
+    """Pedido de upload direto da foto para o storage"""
+    sha256: str = Field(..., pattern=r"^[0-9a-fA-F]{64}$")
+    content_type: str
+    size: int = Field(..., gt=0)
+
+
+class PhotoConfirmRequest(BaseModel):
+    """Confirmação de upload direto concluído"""
+    filename: str
+
+
 # Dashboard/Report Schemas
 class ObraDetailResponse(ObraResponse):
     engineers: List[UserResponse] = []
@@ -229,6 +299,7 @@ class RecentActivity(BaseModel):
     timestamp: datetime
     obra_nome: str
     usuario_nome: str
+    cursor: Optional[str] = None  # Passar em ?cursor= para buscar as atividades anteriores
 
 
 class ConformidadeStats(BaseModel):
@@ -1,52 +1,100 @@
-from datetime import timedelta
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
-from app.crud import crud_user
-from app.core.security import create_access_token, verify_password
-from app.schemas.schemas import Token, LoginRequest
+from app.crud import crud_refresh_token, crud_user
+from app.core.config import settings
+from app.core.security import decode_refresh_token
+from app.models.models import User
+from app.schemas.schemas import Token, LoginRequest, RefreshRequest
+from app.services.password_hasher import LatencyStats, password_hasher
+from app.services.token_service import token_service
 
 
 class AuthService:
-    def authenticate_user(
-        self, 
-        db: Session, 
-        email: str, 
+    def __init__(self):
+        # Latência do login inteiro (busca do usuário + bcrypt + token), por resultado
+        self.login_ok = LatencyStats()
+        self.login_failed = LatencyStats()
+
+    async def authenticate_user(
+        self,
+        db: AsyncSession,
+        email: str,
         password: str
-    ) -> Optional[dict]:
-        """Autentica um usuário e retorna o token"""
-        user = crud_user.authenticate(db, email=email, password=password)
+    ) -> Optional[Token]:
+        """Autentica um usuário e retorna os tokens"""
+        user = await crud_user.authenticate_async(db, email=email, password=password)
         if not user:
             return None
         if not crud_user.is_active(user):
             return None
-        
-        access_token = create_access_token(data={"sub": str(user.id)})
-        return {
-            "access_token": access_token,
-            "token_type": "bearer",
-            "user": user
-        }
 
-    def login(self, db: Session, credentials: LoginRequest) -> Token:
-        """Realiza login e retorna token JWT"""
-        result = self.authenticate_user(
-            db, 
-            email=credentials.email, 
-            password=credentials.password
+        return await self._issue(db, user)
+
+    async def _issue(self, db: AsyncSession, user: User, *, family: Optional[str] = None) -> Token:
+        """Par de tokens; o refresh token é registrado no banco (uso único entre workers)"""
+        jti, family = uuid.uuid4().hex, family or uuid.uuid4().hex
+        expires_at = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        await crud_refresh_token.create_async(
+            db, jti=jti, user_id=user.id, family=family, expires_at=expires_at
         )
-        
+        return token_service.issue(user, jti=jti, family=family, expires_at=expires_at)
+
+    async def login(self, db: AsyncSession, credentials: LoginRequest) -> Token:
+        """Realiza login e retorna token JWT"""
+        start = time.perf_counter()
+        result = None
+        try:
+            result = await self.authenticate_user(
+                db,
+                email=credentials.email,
+                password=credentials.password
+            )
+        finally:
+            stats = self.login_ok if result else self.login_failed
+            stats.record(time.perf_counter() - start)
+
         if not result:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        
-        return Token(
-            access_token=result["access_token"],
-            token_type=result["token_type"]
-        )
+
+        return result
+
+    async def refresh(self, db: AsyncSession, request: RefreshRequest) -> Token:
+        """Troca um refresh token por um novo par (rotação), com papel/ativo atuais do banco"""
+        payload = decode_refresh_token(request.refresh_token)
+        user = family = None
+        if payload is not None:
+            family = await crud_refresh_token.claim_async(db, jti=payload["jti"])
+        if family is not None:
+            user = await crud_user.get_async(db, id=int(payload["sub"]))
+        if user is None or not crud_user.is_active(user):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        # Commit único: token antigo marcado como usado + novo token registrado
+        return await self._issue(db, user, family=family)
+
+    async def logout(self, db: AsyncSession, request: RefreshRequest) -> None:
+        """Revoga o refresh token informado e os gerados a partir do mesmo login"""
+        payload = decode_refresh_token(request.refresh_token)
+        if payload is not None:
+            await crud_refresh_token.revoke_family_async(db, family=payload["fam"])
+
+    def get_stats(self) -> dict:
+        """Métricas de login e do pool de hashing"""
+        return {
+            "login": {"ok": self.login_ok.snapshot(), "failed": self.login_failed.snapshot()},
+            "password_hasher": password_hasher.get_stats(),
+        }
 
 
 auth_service = AuthService()
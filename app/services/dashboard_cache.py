@@ -0,0 +1,54 @@
+import json
+import uuid
+from typing import Awaitable, Callable, Optional
+from fastapi.encoders import jsonable_encoder
+from app.core.cache import CacheBackend, get_cache_backend
+from app.core.config import settings
+
+
+class DashboardCache:
+    """Respostas do dashboard por gestor no cache compartilhado.
+
+    Check-ins, checklists e alterações de obras trocam a versão do gestor (em qualquer
+    worker); o TTL curto cobre o que não passa por elas (ex.: total de engenheiros).
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend or get_cache_backend()
+
+    def _version_key(self, gestor_id: int) -> str:
+        return f"dashboard:{gestor_id}:version"
+
+    def bump(self, gestor_id: Optional[int]) -> None:
+        """Chamado após o commit de escritas que alteram os números do gestor"""
+        if gestor_id is not None:
+            self.backend.set(self._version_key(gestor_id), uuid.uuid4().hex.encode())
+
+    async def bump_async(self, gestor_id: Optional[int]) -> None:
+        if gestor_id is not None:
+            await self.backend.set_async(self._version_key(gestor_id), uuid.uuid4().hex.encode())
+
+    async def get_or_build_async(self, gestor_id: int, name: str, build: Callable[[], Awaitable]):
+        """Resposta em cache (JSON) ou calculada por build() e guardada por DASHBOARD_CACHE_TTL_SECONDS"""
+        ttl = settings.DASHBOARD_CACHE_TTL_SECONDS
+        if ttl <= 0:
+            return await build()
+
+        version_key = self._version_key(gestor_id)
+        version = await self.backend.get_async(version_key)
+        if version is None:
+            await self.backend.add_async(version_key, uuid.uuid4().hex.encode())
+            version = await self.backend.get_async(version_key)
+        if version is None:
+            return await build()
+
+        key = f"dashboard:{gestor_id}:{version.decode()}:{name}"
+        raw = await self.backend.get_async(key)
+        if raw is not None:
+            return json.loads(raw)
+        data = jsonable_encoder(await build())
+        await self.backend.set_async(key, json.dumps(data).encode(), ttl)
+        return data
+
+
+dashboard_cache = DashboardCache()
@@ -1,78 +1,329 @@
+import asyncio
+import hashlib
+import json
+import mimetypes
 import os
+import re
+import shutil
+import tempfile
 import uuid
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+import aiofiles
+import aiofiles.os
 from fastapi import UploadFile, HTTPException
 from PIL import Image
 from app.core.config import settings
+from app.services.storage import StorageBackend, get_storage_backend
+
+
+def optimize_image(filepath: str, max_width: int = 1920, max_height: int = 1920):
+    """Otimiza e redimensiona a imagem (executado no pool de processos)"""
+    with Image.open(filepath) as img:
+        # Converter para RGB se necessário
+        if img.mode in ("RGBA", "P"):
+            img = img.convert("RGB")
+
+        # Redimensionar se necessário
+        if img.width > max_width or img.height > max_height:
+            img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+
+        # Salvar com qualidade otimizada
+        img.save(filepath, "JPEG", quality=85, optimize=True)
+
+
+# Derivados gerados após o upload: nome -> (lado máximo em px, formato, sufixo)
+IMAGE_VARIANTS = {
+    "thumb": (320, "JPEG", "_thumb.jpg"),
+    "thumb_webp": (320, "WEBP", "_thumb.webp"),
+    "medium": (960, "JPEG", "_medium.jpg"),
+    "medium_webp": (960, "WEBP", "_medium.webp"),
+    "webp": (1920, "WEBP", "_large.webp"),
+}
+
+# Extensões aceitas em uploads diretos (presigned) por content-type
+DIRECT_UPLOAD_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp"}
+
+# Uploads diretos ficam num prefixo próprio: ali o conteúdo é sempre o original, com o hash do nome
+# (uploads pela API são regravados na otimização e guardados pelo hash do arquivo recebido)
+DIRECT_UPLOAD_PREFIX = "checklist/direct"
+CONTENT_PATH_RE = re.compile(r"^checklist/direct/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.(jpg|png|webp)$")
+
+
+# Assinaturas dos formatos de imagem comuns (originais mantidos quando a otimização falha)
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", ".png", "image/png"),
+    (b"GIF8", ".gif", "image/gif"),
+)
+HEIF_BRANDS = {b"heic": (".heic", "image/heic"), b"heix": (".heic", "image/heic"), b"mif1": (".heif", "image/heif")}
+
+
+def detect_image_type(path: str, declared: str) -> Tuple[str, str]:
+    """Extensão e content-type pelo conteúdo do arquivo (o declarado pelo cliente se não reconhecido)"""
+    with open(path, "rb") as f:
+        header = f.read(16)
+    for signature, ext, content_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return ext, content_type
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp", "image/webp"
+    if header[4:8] == b"ftyp" and header[8:12] in HEIF_BRANDS:
+        return HEIF_BRANDS[header[8:12]]
+    return mimetypes.guess_extension(declared) or "", declared
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 (hex) de um arquivo, lido em blocos"""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def variant_path(filepath: str, variant: str) -> str:
+    """Caminho do derivado de uma imagem (ex.: checklist/abc_thumb.jpg)"""
+    suffix = IMAGE_VARIANTS[variant][2]
+    return f"{os.path.splitext(filepath)[0]}{suffix}"
+
+
+def manifest_path(filepath: str) -> str:
+    """Caminho do manifesto de derivados de uma imagem"""
+    return f"{os.path.splitext(filepath)[0]}.json"
+
+
+def generate_derivatives(source_path: str, work_dir: str, filepath: str) -> dict:
+    """Gera os derivados de uma imagem em work_dir (executado no pool de processos)"""
+    variants = {}
+    with Image.open(source_path) as img:
+        if img.mode in ("RGBA", "P"):
+            img = img.convert("RGB")
+
+        for name, (max_side, fmt, _) in IMAGE_VARIANTS.items():
+            rendition = img.copy()
+            rendition.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            path = variant_path(filepath, name)
+            output = os.path.join(work_dir, os.path.basename(path))
+            options = {"quality": 80, "method": 4} if fmt == "WEBP" else {"quality": 80, "optimize": True}
+            rendition.save(output, fmt, **options)
+            variants[name] = {
+                "path": path,
+                "width": rendition.width,
+                "height": rendition.height,
+                "format": fmt.lower(),
+                "size": os.path.getsize(output),
+            }
+
+    return {"original": filepath, "variants": variants}
 
 
 class FileUploadService:
-    def __init__(self):
+    def __init__(self, storage: Optional[StorageBackend] = None):
         self.upload_dir = settings.UPLOAD_DIR
         self.max_size = settings.MAX_UPLOAD_SIZE
-        
+        self.chunk_size = settings.UPLOAD_CHUNK_SIZE
+        self.storage = storage or get_storage_backend()
+
+        # Arquivos temporários no mesmo disco dos uploads (rename atômico no backend local)
+        self.tmp_dir = os.path.join(self.upload_dir, ".tmp")
+
+        # Pool de processos para o processamento de imagens (criado sob demanda)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
         # Criar diretório de upload se não existir
         os.makedirs(self.upload_dir, exist_ok=True)
-        os.makedirs(os.path.join(self.upload_dir, "checklist"), exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
 
     async def save_checklist_photo(self, file: UploadFile) -> str:
-        """Salva uma foto do checklist e retorna o caminho"""
+        """Salva uma foto do checklist e retorna o caminho (idempotente por conteúdo)"""
         # Validar tipo de arquivo
         if not file.content_type or not file.content_type.startswith("image/"):
             raise HTTPException(status_code=400, detail="File must be an image")
-        
-        # Validar tamanho
-        contents = await file.read()
-        if len(contents) > self.max_size:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"File too large. Max size: {self.max_size / (1024*1024)}MB"
-            )
-        
-        # Gerar nome único
-        ext = os.path.splitext(file.filename)[1] if file.filename else ".jpg"
-        filename = f"{uuid.uuid4()}{ext}"
-        filepath = os.path.join(self.upload_dir, "checklist", filename)
-        
-        # Salvar arquivo
-        with open(filepath, "wb") as f:
-            f.write(contents)
-        
-        # Opcional: comprimir/redimensionar imagem
+
+        # Validar tamanho informado antes de ler o conteúdo
+        if file.size is not None and file.size > self.max_size:
+            raise self._too_large()
+
+        # Salvar em arquivo temporário, calculando o hash durante a cópia
+        tmp_path = os.path.join(self.tmp_dir, f"{uuid.uuid4()}.part")
+        digest = await self._stream_to_disk(file, tmp_path)
+
+        # Nome derivado do conteúdo, em subdiretórios para evitar pastas gigantes
+        relative_path = self._content_path(digest)
+
         try:
-            self._optimize_image(filepath)
-        except Exception as e:
-            print(f"Error optimizing image: {e}")
-        
+            if await self.storage.exists(relative_path):
+                # Mesmo conteúdo já enviado (ex.: retry do app): reaproveitar
+                return relative_path
+
+            # Opcional: comprimir/redimensionar imagem
+            content_type = "image/jpeg"
+            try:
+                await self._run_in_pool(optimize_image, tmp_path)
+            except Exception as e:
+                print(f"Error optimizing image: {e}")
+                # Original mantido (ex.: HEIC sem suporte no Pillow): gravar com o tipo real
+                ext, content_type = detect_image_type(tmp_path, file.content_type)
+                relative_path = self._content_path(digest, ext)
+                if await self.storage.exists(relative_path):
+                    return relative_path
+
+            await self.storage.put_file(tmp_path, relative_path, content_type)
+        finally:
+            if os.path.exists(tmp_path):
+                await aiofiles.os.remove(tmp_path)
+
         # Retornar path relativo
-        return f"checklist/{filename}"
-
-    def _optimize_image(self, filepath: str, max_width: int = 1920, max_height: int = 1920):
-        """Otimiza e redimensiona a imagem"""
-        with Image.open(filepath) as img:
-            # Converter para RGB se necessário
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
-            
-            # Redimensionar se necessário
-            if img.width > max_width or img.height > max_height:
-                img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-            
-            # Salvar com qualidade otimizada
-            img.save(filepath, "JPEG", quality=85, optimize=True)
-
-    def delete_file(self, filepath: str) -> bool:
-        """Deleta um arquivo"""
-        full_path = os.path.join(self.upload_dir, filepath)
-        if os.path.exists(full_path):
-            os.remove(full_path)
-            return True
-        return False
+        return relative_path
+
+    def _content_path(self, digest: str, ext: str = ".jpg", prefix: str = "checklist") -> str:
+        """Caminho relativo endereçado pelo conteúdo (checklist/ab/cd/abcd....jpg)"""
+        # Uploads via API são regravados como JPEG na otimização; se ela falha, ext é a do original
+        return f"{prefix}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    async def _stream_to_disk(self, file: UploadFile, tmp_path: str) -> str:
+        """Copia o upload para o disco em blocos e retorna o SHA-256 do conteúdo"""
+        sha256 = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                while chunk := await file.read(self.chunk_size):
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise self._too_large()
+                    sha256.update(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                await aiofiles.os.remove(tmp_path)
+            raise
+        return sha256.hexdigest()
+
+    def _too_large(self) -> HTTPException:
+        return HTTPException(
+            status_code=400,
+            detail=f"File too large. Max size: {self.max_size / (1024*1024)}MB"
+        )
+
+    async def presign_checklist_photo(self, *, sha256: str, content_type: str, size: int) -> dict:
+        """Prepara um upload direto do cliente para o storage (sem passar pela API)"""
+        ext = DIRECT_UPLOAD_EXTENSIONS.get(content_type)
+        if ext is None:
+            raise HTTPException(status_code=400, detail="Unsupported image type")
+        if size > self.max_size:
+            raise self._too_large()
+
+        sha256 = sha256.lower()
+        relative_path = self._content_path(sha256, ext, prefix=DIRECT_UPLOAD_PREFIX)
+        if await self.storage.exists(relative_path):
+            # Conteúdo já armazenado: nada a enviar (nunca gera upload sobre uma chave existente)
+            return {"filename": relative_path, "exists": True, "upload": None}
+
+        upload = self.storage.presigned_upload(
+            relative_path,
+            content_type=content_type,
+            max_size=self.max_size,
+            expires=settings.S3_PRESIGN_EXPIRES,
+            sha256=sha256,
+        )
+        if upload is None:
+            raise HTTPException(status_code=400, detail="Direct upload not supported by storage backend")
+        return {"filename": relative_path, "exists": False, "upload": upload}
+
+    async def confirm_checklist_photo(self, filepath: str) -> str:
+        """Confirma um upload direto concluído pelo cliente"""
+        if not CONTENT_PATH_RE.match(filepath) or not await self.storage.exists(filepath):
+            raise HTTPException(status_code=404, detail="Uploaded file not found")
+
+        # A chave é o hash declarado pelo cliente: confere o conteúdo gravado (storages
+        # que ignoram o checksum do upload) para ninguém ocupar o hash de outro conteúdo
+        expected = os.path.splitext(os.path.basename(filepath))[0]
+        if await self._stored_sha256(filepath) != expected:
+            await self.storage.delete(filepath)
+            raise HTTPException(status_code=400, detail="Uploaded file does not match its checksum")
+        return filepath
+
+    async def _stored_sha256(self, filepath: str) -> str:
+        """SHA-256 do conteúdo armazenado na chave"""
+        local_path = self.storage.local_path(filepath)
+        if local_path is not None:
+            return await asyncio.to_thread(file_sha256, local_path, self.chunk_size)
+        work_dir = tempfile.mkdtemp(dir=self.tmp_dir)
+        try:
+            downloaded = os.path.join(work_dir, "source")
+            await self.storage.download(filepath, downloaded)
+            return await asyncio.to_thread(file_sha256, downloaded, self.chunk_size)
+        finally:
+            await asyncio.to_thread(shutil.rmtree, work_dir, True)
+
+    async def _run_in_pool(self, func, *args):
+        """Executa func no pool de processos, limitando os jobs em andamento"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+            # Backpressure: no máximo 2 jobs por processo aguardando/executando
+            self._slots = asyncio.Semaphore(settings.IMAGE_WORKERS * 2)
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+
+    async def generate_derivatives(self, filepath: str) -> Optional[dict]:
+        """Gera thumbnails/WebP da imagem em segundo plano"""
+        if await self.storage.exists(manifest_path(filepath)):
+            # Conteúdo repetido: derivados já gerados
+            return None
+
+        work_dir = tempfile.mkdtemp(dir=self.tmp_dir)
+        try:
+            source_path = self.storage.local_path(filepath)
+            if source_path is None:
+                source_path = os.path.join(work_dir, "source")
+                await self.storage.download(filepath, source_path)
+
+            manifest = await self._run_in_pool(generate_derivatives, source_path, work_dir, filepath)
+            for variant in manifest["variants"].values():
+                output = os.path.join(work_dir, os.path.basename(variant["path"]))
+                await self.storage.put_file(output, variant["path"])
+
+            # Manifesto gravado por último: sua presença indica derivados prontos
+            manifest_file = os.path.join(work_dir, "manifest.json")
+            async with aiofiles.open(manifest_file, "w") as f:
+                await f.write(json.dumps(manifest))
+            await self.storage.put_file(manifest_file, manifest_path(filepath), "application/json")
+            return manifest
+        except Exception as e:
+            print(f"Error generating image derivatives: {e}")
+            return None
+        finally:
+            await asyncio.to_thread(shutil.rmtree, work_dir, True)
+
+    def get_variant_urls(self, filepath: str) -> dict:
+        """URLs dos derivados de uma imagem (disponíveis após a geração)"""
+        return {name: self.get_file_url(variant_path(filepath, name)) for name in IMAGE_VARIANTS}
+
+    def get_manifest_url(self, filepath: str) -> str:
+        return self.get_file_url(manifest_path(filepath))
+
+    async def delete_file(self, filepath: str) -> bool:
+        """Deleta um arquivo (e seus derivados, se houver)"""
+        if not await self.storage.delete(filepath):
+            return False
+        derived = [variant_path(filepath, name) for name in IMAGE_VARIANTS] + [manifest_path(filepath)]
+        for path in derived:
+            await self.storage.delete(path)
+        return True
 
     def get_file_url(self, filepath: str) -> str:
         """Retorna a URL completa do arquivo"""
-        # Em produção, você pode retornar uma URL do CDN ou storage
-        return f"/uploads/{filepath}"
+        return self.storage.url(filepath)
+
+    def shutdown(self):
+        """Encerra o pool de processos"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._slots = None
 
 
 file_service = FileUploadService()
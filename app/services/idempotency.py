@@ -0,0 +1,72 @@
+import hashlib
+from typing import Awaitable, Callable, Optional, Type, TypeVar
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+ResponseT = TypeVar("ResponseT", bound=BaseModel)
+
+
+class IdempotencyStore:
+    """Respostas já enviadas, chaveadas por (usuário, rota, Idempotency-Key), com expiração"""
+
+    def __init__(self):
+        # Por entrada: digest de 16 bytes do corpo do pedido + a resposta serializável
+        self._cache = TTLCache(
+            maxsize=settings.IDEMPOTENCY_MAX_SIZE,
+            ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+        )
+
+    def fingerprint(self, request: BaseModel) -> bytes:
+        """Digest do corpo do pedido (sem a chave: item do sync e POST avulso com a mesma chave coincidem)"""
+        payload = request.model_dump_json(exclude={"idempotency_key"})
+        return hashlib.blake2b(payload.encode(), digest_size=16).digest()
+
+    def _check(self, fingerprint: Optional[bytes], request: BaseModel) -> None:
+        if fingerprint is not None and fingerprint != self.fingerprint(request):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key already used with a different request",
+            )
+
+    def get(self, user_id: int, scope: str, key: str, request: BaseModel) -> Optional[BaseModel]:
+        item = self._cache.get((user_id, scope, key))
+        if item is None:
+            return None
+        fingerprint, response = item
+        self._check(fingerprint, request)
+        return response
+
+    def set(
+        self, user_id: int, scope: str, key: str, request: BaseModel, response: ResponseT
+    ) -> ResponseT:
+        self._cache.set((user_id, scope, key), (self.fingerprint(request), response))
+        return response
+
+    async def replay(
+        self,
+        *,
+        user_id: int,
+        scope: str,
+        key: str,
+        request: BaseModel,
+        response_model: Type[ResponseT],
+        load: Callable[[], Awaitable[Optional[object]]],
+    ) -> Optional[ResponseT]:
+        """Resposta já enviada para a chave: do cache ou do registro gravado com ela (outro worker/reinício)"""
+        cached = self.get(user_id, scope, key, request)
+        if cached is not None:
+            return cached
+        existing = await load()
+        if existing is None:
+            return None
+        # Registros gravados antes do digest existir (request_fingerprint nulo) são reenviados sem checagem
+        self._check(existing.request_fingerprint, request)
+        return self.set(user_id, scope, key, request, response_model.model_validate(existing))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+from fastapi import HTTPException, status
+from app.core.config import settings
+from app.core.security import get_password_hash, password_needs_rehash, verify_password
+
+
+class LatencyStats:
+    """Contagem e latência (média/máxima) de uma operação"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, elapsed: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total += elapsed
+            self.max = max(self.max, elapsed)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "count": self.count,
+                "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+                "max_ms": round(self.max * 1000, 3),
+            }
+
+
+class PasswordHasher:
+    """bcrypt num pool de threads dedicado, fora do threadpool das rotas e do event loop.
+
+    O bcrypt libera o GIL durante o cálculo, então PASSWORD_HASH_WORKERS threads usam
+    até esse número de núcleos. Pedidos além de PASSWORD_HASH_MAX_PENDING (executando +
+    na fila) são recusados com 503 em vez de acumular latência.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_MAX_PENDING)
+        self.queue_wait = LatencyStats()
+        self.hash_time = LatencyStats()
+        self.verify_time = LatencyStats()
+        self.rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"
+                    )
+        return self._executor
+
+    def _submit(self, func: Callable, stats: LatencyStats, *args) -> Future:
+        """Agenda func no pool; 503 se a fila estiver cheia"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        submitted = time.perf_counter()
+
+        def run():
+            started = time.perf_counter()
+            self.queue_wait.record(started - submitted)
+            try:
+                return func(*args)
+            finally:
+                stats.record(time.perf_counter() - started)
+
+        try:
+            future = self._get_executor().submit(run)
+        except RuntimeError:
+            # Pool encerrado (shutdown): a tarefa nunca vai rodar
+            self._slots.release()
+            raise
+        # Libera a vaga também quando o Future é cancelado na fila (cliente desconectou)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash(self, password: str) -> str:
+        return self._submit(get_password_hash, self.hash_time, password).result()
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self._submit(verify_password, self.verify_time, password, hashed_password).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(get_password_hash, self.hash_time, password))
+
+    async def verify_async(self, password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(
+            self._submit(verify_password, self.verify_time, password, hashed_password)
+        )
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return password_needs_rehash(hashed_password)
+
+    def get_stats(self) -> dict:
+        """Métricas do pool de hashing"""
+        return {
+            "workers": settings.PASSWORD_HASH_WORKERS,
+            "max_pending": settings.PASSWORD_HASH_MAX_PENDING,
+            "rounds": settings.BCRYPT_ROUNDS,
+            "queue_wait": self.queue_wait.snapshot(),
+            "hash": self.hash_time.snapshot(),
+            "verify": self.verify_time.snapshot(),
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        """Encerra o pool de threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,177 @@
+import asyncio
+import base64
+import mimetypes
+import os
+import shutil
+from abc import ABC, abstractmethod
+from typing import Optional
+from app.core.config import settings
+
+
+def guess_content_type(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+class StorageBackend(ABC):
+    """Interface de armazenamento dos arquivos enviados (chaves relativas, ex.: checklist/ab/cd/x.jpg)"""
+
+    @abstractmethod
+    async def put_file(self, local_path: str, key: str, content_type: Optional[str] = None) -> None:
+        """Move/envia um arquivo local para a chave informada"""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Verifica se a chave existe"""
+
+    @abstractmethod
+    async def download(self, key: str, local_path: str) -> None:
+        """Copia o conteúdo da chave para um arquivo local"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Remove a chave e retorna se ela existia"""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """URL pública do arquivo"""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Caminho no disco local, quando o backend é o próprio disco"""
+        return None
+
+    def presigned_upload(
+        self, key: str, *, content_type: str, max_size: int, expires: int, sha256: str
+    ) -> Optional[dict]:
+        """Dados para upload direto pelo cliente, preso ao SHA-256 informado (None se não suportado)"""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """Arquivos no disco local, servidos pelo nginx em /uploads"""
+
+    def __init__(self, base_dir: str, base_url: str = "/uploads"):
+        self.base_dir = base_dir
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.base_dir, key)
+
+    async def put_file(self, local_path: str, key: str, content_type: Optional[str] = None) -> None:
+        dest = self.local_path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        # Mesmo sistema de arquivos: rename atômico
+        await asyncio.to_thread(shutil.move, local_path, dest)
+
+    async def exists(self, key: str) -> bool:
+        return os.path.exists(self.local_path(key))
+
+    async def download(self, key: str, local_path: str) -> None:
+        await asyncio.to_thread(shutil.copyfile, self.local_path(key), local_path)
+
+    async def delete(self, key: str) -> bool:
+        path = self.local_path(key)
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+class S3Storage(StorageBackend):
+    """Bucket S3 ou compatível (MinIO, R2, ...) via boto3"""
+
+    def __init__(
+        self,
+        bucket: str,
+        *,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        public_url: Optional[str] = None,
+    ):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)") from e
+
+        self.bucket = bucket
+        self._client_error = ClientError
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+        )
+        if public_url:
+            self.public_url = public_url.rstrip("/")
+        elif endpoint_url:
+            self.public_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self.public_url = f"https://{bucket}.s3.amazonaws.com"
+
+    async def put_file(self, local_path: str, key: str, content_type: Optional[str] = None) -> None:
+        extra = {"ContentType": content_type or guess_content_type(key)}
+        await asyncio.to_thread(self.client.upload_file, local_path, self.bucket, key, ExtraArgs=extra)
+        os.remove(local_path)
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=key)
+            return True
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    async def download(self, key: str, local_path: str) -> None:
+        await asyncio.to_thread(self.client.download_file, self.bucket, key, local_path)
+
+    async def delete(self, key: str) -> bool:
+        existed = await self.exists(key)
+        if existed:
+            await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=key)
+        return existed
+
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{key}"
+
+    def presigned_upload(
+        self, key: str, *, content_type: str, max_size: int, expires: int, sha256: str
+    ) -> dict:
+        # O S3 recusa o upload se o conteúdo não tiver exatamente este SHA-256
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        fields = {
+            "Content-Type": content_type,
+            "x-amz-checksum-algorithm": "SHA256",
+            "x-amz-checksum-sha256": checksum,
+        }
+        return self.client.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=key,
+            Fields=fields,
+            Conditions=[
+                *({name: value} for name, value in fields.items()),
+                ["content-length-range", 1, max_size],
+            ],
+            ExpiresIn=expires,
+        )
+
+
+def get_storage_backend() -> StorageBackend:
+    """Backend configurado em STORAGE_BACKEND"""
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            settings.S3_BUCKET,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            public_url=settings.S3_PUBLIC_URL,
+        )
+    return LocalStorage(settings.UPLOAD_DIR)
@@ -0,0 +1,163 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.crud import (
+    crud_obra,
+    crud_checkin,
+    crud_checklist_template,
+    crud_checklist_submission,
+    crud_obra_daily_stats,
+    crud_activity_event,
+    crud_sync_tombstone,
+)
+from app.crud.crud_stats import status_counts
+from app.services.dashboard_cache import dashboard_cache
+from app.schemas.schemas import MobileCatalogDelta, MobileSyncRequest, MobileSyncResponse, SyncItemResult
+
+# Recuo do watermark: cobre transações abertas antes dele e confirmadas depois da leitura
+WATERMARK_OVERLAP = timedelta(seconds=30)
+
+
+class MobileSyncService:
+    """Grava em lote os registros feitos offline pelo app (uma transação, queries constantes)"""
+
+    async def sync(
+        self, db: AsyncSession, *, sync_in: MobileSyncRequest, engineer_id: int
+    ) -> MobileSyncResponse:
+        total = len(sync_in.checkins) + len(sync_in.submissions)
+        if total > settings.SYNC_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Too many items. Max: {settings.SYNC_MAX_ITEMS}",
+            )
+
+        # Autorização do lote inteiro: templates e obras consultados uma única vez
+        templates = {}
+        if sync_in.submissions:
+            templates = await crud_checklist_template.get_item_ids_by_template_async(
+                db, template_ids=[s.template_id for s in sync_in.submissions]
+            )
+        obra_ids = {c.obra_id for c in sync_in.checkins} | {obra_id for obra_id, _ in templates.values()}
+        allowed = set()
+        if obra_ids:
+            allowed = await crud_obra.get_accessible_obra_ids_async(
+                db, engineer_id=engineer_id, obra_ids=obra_ids
+            )
+
+        def validate_checkin(checkin) -> Optional[str]:
+            if checkin.obra_id not in allowed:
+                return "Not authorized for this obra"
+            return None
+
+        def validate_submission(submission) -> Optional[str]:
+            if submission.template_id not in templates:
+                return "Checklist template not found"
+            obra_id, item_ids = templates[submission.template_id]
+            if obra_id not in allowed:
+                return "Not authorized for this checklist"
+            invalid_items = sorted({r.template_item_id for r in submission.responses} - item_ids)
+            if invalid_items:
+                return f"Invalid template items: {invalid_items}"
+            return None
+
+        checkins, created_checkins = await self._write(
+            db, sync_in.checkins, validate_checkin, crud_checkin, engineer_id
+        )
+        submissions, created_submissions = await self._write(
+            db, sync_in.submissions, validate_submission, crud_checklist_submission, engineer_id
+        )
+
+        # Rollup diário e feed de atividades dos registros criados, na mesma transação
+        counters: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        events = []
+        for checkin, checkin_id in created_checkins:
+            counters[checkin.obra_id]["checkins"] += 1
+            events.append(("checkin", checkin.obra_id, checkin_id))
+        for submission, submission_id in created_submissions:
+            obra_id = templates[submission.template_id][0]
+            counters[obra_id]["submissions"] += 1
+            for name, count in status_counts(r.status for r in submission.responses).items():
+                counters[obra_id][name] += count
+            events.append(("checklist", obra_id, submission_id))
+        gestor_ids = await crud_obra_daily_stats.record_many_async(db, counters=counters)
+        await crud_activity_event.record_many_async(db, user_id=engineer_id, events=events)
+        await db.commit()
+        for gestor_id in gestor_ids:
+            await dashboard_cache.bump_async(gestor_id)
+
+        return MobileSyncResponse(checkins=checkins, submissions=submissions)
+
+    async def catalog_delta(
+        self, db: AsyncSession, *, engineer_id: int, since: Optional[datetime] = None
+    ) -> MobileCatalogDelta:
+        """Obras/templates alterados após since (tudo se since=None), mais os removidos ou desativados"""
+        watermark = await db.scalar(select(func.now())) - WATERMARK_OVERLAP
+        obras = await crud_obra.get_changed_for_engineer_async(db, engineer_id=engineer_id, since=since)
+        templates = await crud_checklist_template.get_changed_for_engineer_async(
+            db, engineer_id=engineer_id, since=since
+        )
+        deleted = {}
+        if since is not None:
+            deleted = await crud_sync_tombstone.get_deleted_since_async(db, engineer_id=engineer_id, since=since)
+
+        # Removido e depois reativado/atribuído de novo: vale o estado atual (enviado acima)
+        def still_deleted(entity: str, current: set) -> List[int]:
+            return sorted(set(deleted.get(entity, [])) - current)
+
+        return MobileCatalogDelta(
+            watermark=watermark,
+            full=since is None,
+            obras=obras,
+            templates=templates,
+            deleted_obras=still_deleted("obra", {obra.id for obra in obras}),
+            deleted_templates=still_deleted("template", {template.id for template in templates}),
+            deleted_template_items=still_deleted(
+                "template_item", {item.id for template in templates for item in template.items}
+            ),
+        )
+
+    async def _write(self, db: AsyncSession, items: List, validate: Callable, crud, engineer_id: int):
+        """Insere os itens novos e monta o resultado de cada um, na ordem recebida"""
+        # Chave repetida no próprio lote: vale a primeira ocorrência
+        first = {}
+        for item in items:
+            first.setdefault(item.idempotency_key, item)
+
+        # Chaves já gravadas (reenvio após resposta perdida) não são validadas de novo
+        existing = await crud.get_ids_by_keys_async(db, engineer_id=engineer_id, keys=list(first))
+        errors = {}
+        to_create = {}
+        for key, item in first.items():
+            if key in existing:
+                continue
+            error = validate(item)
+            if error:
+                errors[key] = error
+            else:
+                to_create[key] = item
+
+        created = await crud.create_many_async(db, objs_in=to_create, engineer_id=engineer_id)
+        # Chaves gravadas por uma requisição concorrente (ignoradas pelo ON CONFLICT)
+        missing = [key for key in to_create if key not in created]
+        if missing:
+            existing.update(await crud.get_ids_by_keys_async(db, engineer_id=engineer_id, keys=missing))
+
+        results = []
+        for item in items:
+            key = item.idempotency_key
+            if key in errors:
+                results.append(SyncItemResult(idempotency_key=key, status="error", detail=errors[key]))
+            elif key in created and item is first[key]:
+                results.append(SyncItemResult(idempotency_key=key, status="created", id=created[key]))
+            else:
+                results.append(SyncItemResult(
+                    idempotency_key=key, status="duplicate", id=existing.get(key, created.get(key))
+                ))
+        return results, [(to_create[key], item_id) for key, item_id in created.items()]
+
+
+sync_service = MobileSyncService()
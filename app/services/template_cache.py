@@ -0,0 +1,122 @@
+import uuid
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+from pydantic import TypeAdapter
+from app.core.cache import CacheBackend, TTLCache, get_cache_backend
+from app.core.config import settings
+from app.models.models import ChecklistTemplate
+from app.schemas.schemas import ChecklistTemplateResponse
+from app.utils.http_cache import compute_etag
+
+_templates_adapter = TypeAdapter(List[ChecklistTemplateResponse])
+
+
+@dataclass(frozen=True)
+class CachedTemplates:
+    """Lista de templates (com items) já serializada em JSON"""
+    body: bytes
+    etag: str
+
+    def encode(self) -> bytes:
+        return self.etag.encode() + b"\n" + self.body
+
+    @classmethod
+    def decode(cls, raw: bytes) -> "CachedTemplates":
+        etag, _, body = raw.partition(b"\n")
+        return cls(body=body, etag=etag.decode())
+
+
+class ChecklistTemplateCache:
+    """Templates de cada obra já serializados, no cache compartilhado e invalidados por versão.
+
+    A versão da obra fica no backend: uma escrita em qualquer worker torna obsoletas as
+    entradas de todos. Com backend remoto, cada processo guarda ainda uma cópia local
+    (chaveada pela versão, então nunca desatualizada). Com backend por processo a escrita
+    num worker não chega aos outros: as entradas duram só TEMPLATE_CACHE_LOCAL_TTL_SECONDS.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend or get_cache_backend()
+        self._local = None
+        self.ttl = settings.TEMPLATE_CACHE_TTL_SECONDS
+        if self.backend.shared:
+            self._local = TTLCache(maxsize=settings.TEMPLATE_CACHE_MAX_SIZE, ttl=self.ttl)
+        else:
+            self.ttl = min(self.ttl, settings.TEMPLATE_CACHE_LOCAL_TTL_SECONDS)
+
+    def _version_key(self, obra_id: int) -> str:
+        return f"templates:{obra_id}:version"
+
+    def _entry_key(self, obra_id: int, version: bytes, skip: int, limit: int) -> str:
+        return f"templates:{obra_id}:{version.decode()}:{skip}:{limit}"
+
+    def _new_version(self) -> bytes:
+        # Token aleatório: versão perdida (expulsa do LRU, Redis reiniciado) nunca reaproveita entradas antigas
+        return uuid.uuid4().hex.encode()
+
+    def bump(self, obra_id: int) -> None:
+        """Chamado após o commit de qualquer escrita nos templates/items da obra"""
+        self.backend.set(self._version_key(obra_id), self._new_version())
+
+    def _serialize(self, templates: List[ChecklistTemplate]) -> CachedTemplates:
+        rows = [*templates, *(item for template in templates for item in template.items)]
+        return CachedTemplates(body=_templates_adapter.dump_json(templates), etag=compute_etag(rows))
+
+    def version(self, obra_id: int) -> Optional[bytes]:
+        """Versão atual da obra (None se o backend estiver indisponível)"""
+        key = self._version_key(obra_id)
+        version = self.backend.get(key)
+        if version is None:
+            self.backend.add(key, self._new_version())
+            version = self.backend.get(key)
+        return version
+
+    def get_or_load(
+        self, obra_id: int, skip: int, limit: int, load: Callable[[], List[ChecklistTemplate]]
+    ) -> CachedTemplates:
+        # Versão lida antes da query: se uma escrita ocorrer no meio, a entrada nasce obsoleta
+        version = self.version(obra_id)
+        if version is None:
+            return self._serialize(load())
+        key = self._entry_key(obra_id, version, skip, limit)
+        entry = self._local.get(key) if self._local is not None else None
+        if entry is None:
+            raw = self.backend.get(key)
+            if raw is not None:
+                entry = CachedTemplates.decode(raw)
+            else:
+                entry = self._serialize(load())
+                self.backend.set(key, entry.encode(), self.ttl)
+            if self._local is not None:
+                self._local.set(key, entry)
+        return entry
+
+    async def version_async(self, obra_id: int) -> Optional[bytes]:
+        key = self._version_key(obra_id)
+        version = await self.backend.get_async(key)
+        if version is None:
+            await self.backend.add_async(key, self._new_version())
+            version = await self.backend.get_async(key)
+        return version
+
+    async def get_or_load_async(
+        self, obra_id: int, skip: int, limit: int, load: Callable[[], Awaitable[List[ChecklistTemplate]]]
+    ) -> CachedTemplates:
+        version = await self.version_async(obra_id)
+        if version is None:
+            return self._serialize(await load())
+        key = self._entry_key(obra_id, version, skip, limit)
+        entry = self._local.get(key) if self._local is not None else None
+        if entry is None:
+            raw = await self.backend.get_async(key)
+            if raw is not None:
+                entry = CachedTemplates.decode(raw)
+            else:
+                entry = self._serialize(await load())
+                await self.backend.set_async(key, entry.encode(), self.ttl)
+            if self._local is not None:
+                self._local.set(key, entry)
+        return entry
+
+
+template_cache = ChecklistTemplateCache()
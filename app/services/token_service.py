@@ -0,0 +1,65 @@
+import time
+from datetime import datetime
+from typing import Optional
+from app.core.cache import CacheBackend, TTLCache, get_cache_backend
+from app.core.config import settings
+from app.core.security import create_access_token, create_refresh_token
+from app.models.models import User
+from app.schemas.schemas import Token
+
+
+class TokenService:
+    """Emissão de tokens e lista de revogação dos access tokens por usuário.
+
+    Access tokens levam papel/ativo nas claims e são aceitos sem consultar o banco; uma
+    revogação (desativação, troca de papel/senha) é publicada a todos os workers e fica
+    em memória até o último access token afetado expirar. Com CACHE_BACKEND=memory ela só
+    alcança o próprio worker: nos demais o token vale até expirar (ACCESS_TOKEN_EXPIRE_MINUTES).
+    Uso único e revogação dos refresh tokens ficam no banco (crud_refresh_token).
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        # user_id -> instante da revogação; tokens emitidos até lá deixam de valer
+        self._revoked = TTLCache(
+            maxsize=settings.TOKEN_REVOCATION_MAX_SIZE,
+            ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        )
+        self.backend = backend or get_cache_backend()
+        self.backend.subscribe(self._on_revoke)
+
+    def issue(self, user: User, *, jti: str, family: str, expires_at: datetime) -> Token:
+        """Par access + refresh para o usuário (o refresh já registrado no banco com jti/family)"""
+        access_token = create_access_token(
+            data={"sub": str(user.id), "role": user.role.value, "active": bool(user.is_active)}
+        )
+        return Token(
+            access_token=access_token,
+            token_type="bearer",
+            refresh_token=create_refresh_token(user.id, jti=jti, family=family, expires_at=expires_at),
+            expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        )
+
+    def is_revoked(self, user_id: int, issued_at: Optional[float]) -> bool:
+        """Access token emitido antes da última revogação do usuário (consulta só local)"""
+        revoked_at = self._revoked.get(user_id)
+        return revoked_at is not None and (issued_at is None or issued_at <= revoked_at)
+
+    def revoke_user(self, user_id: int) -> None:
+        """Invalida os access tokens já emitidos para o usuário, em todos os workers"""
+        revoked_at = time.time()
+        self._mark_revoked(user_id, revoked_at)
+        self.backend.publish(f"revoke:{user_id}:{revoked_at!r}")
+
+    def _mark_revoked(self, user_id: int, revoked_at: float) -> None:
+        current = self._revoked.get(user_id)
+        if current is None or revoked_at > current:
+            self._revoked.set(user_id, revoked_at)
+
+    def _on_revoke(self, message: str) -> None:
+        namespace, _, rest = message.partition(":")
+        if namespace == "revoke":
+            user_id, _, revoked_at = rest.partition(":")
+            self._mark_revoked(int(user_id), float(revoked_at))
+
+
+token_service = TokenService()
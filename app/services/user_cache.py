@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+from typing import Optional
+from app.core.cache import CacheBackend, TTLCache, get_cache_backend
+from app.core.config import settings
+from app.models.models import User, UserRole
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """Identidade mínima do usuário autenticado usada na autorização"""
+    id: int
+    role: UserRole
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserPrincipal":
+        return cls(id=user.id, role=user.role, is_active=bool(user.is_active))
+
+
+class UserPrincipalCache:
+    """Cache por processo de usuários autenticados, chaveado por (user_id, token).
+
+    Invalidações são publicadas no backend compartilhado e aplicadas em todos os workers.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self._cache = TTLCache(
+            maxsize=settings.USER_CACHE_MAX_SIZE,
+            ttl=settings.USER_CACHE_TTL_SECONDS,
+        )
+        self.backend = backend or get_cache_backend()
+        self.backend.subscribe(self._on_invalidate)
+
+    def get(self, user_id: int, token: str) -> Optional[UserPrincipal]:
+        return self._cache.get((user_id, token))
+
+    def set(self, user_id: int, token: str, principal: UserPrincipal) -> UserPrincipal:
+        return self._cache.set((user_id, token), principal)
+
+    def invalidate(self, user_id: int) -> None:
+        """Descarta todas as entradas do usuário (ex.: após update ou desativação)"""
+        self._drop(user_id)
+        self.backend.publish(f"user:{user_id}")
+
+    def _drop(self, user_id: int) -> None:
+        self._cache.delete_where(lambda key: key[0] == user_id)
+
+    def _on_invalidate(self, message: str) -> None:
+        namespace, _, user_id = message.partition(":")
+        if namespace == "user":
+            self._drop(int(user_id))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+user_cache = UserPrincipalCache()
@@ -0,0 +1,89 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable, List, Optional
+from fastapi import Request, Response
+from app.core.config import settings
+
+# Primeiro atributo preenchido define a versão da linha (registros imutáveis usam a data de criação)
+VERSION_ATTRS = ("updated_at", "created_at", "checkin_time", "submitted_at")
+
+
+def _row_version(obj: Any) -> tuple:
+    version = next(
+        (value for attr in VERSION_ATTRS if (value := getattr(obj, attr, None)) is not None), None
+    )
+    return type(obj).__name__, getattr(obj, "id", None), version
+
+
+def compute_etag(rows: Iterable[Any]) -> str:
+    """ETag fraco a partir de (tipo, id, versão) de cada linha, sem serializar o payload"""
+    versions = [_row_version(obj) for obj in rows]
+    digest = hashlib.blake2b(repr((settings.VERSION, versions)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    """Comparação fraca (RFC 9110): ignora o prefixo W/"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def not_modified(
+    request: Request, response: Response, resource: Any, *, related: Iterable[Any] = ()
+) -> Optional[Response]:
+    """Define ETag/Cache-Control na resposta; retorna um 304 se o cliente já tem a versão atual.
+
+    Last-Modified só é enviado para um objeto isolado: em listas, remoções não mudam
+    a data mais recente e o If-Modified-Since daria 304 indevido.
+    """
+    rows: List[Any] = (list(resource) if isinstance(resource, list) else [resource]) + list(related)
+    headers = _cache_headers(compute_etag(rows))
+    last_modified = None
+    if not isinstance(resource, list) and not related:
+        last_modified = _row_version(resource)[2]
+        if last_modified is not None:
+            headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(headers["ETag"], if_none_match):
+            return Response(status_code=304, headers=headers)
+    elif last_modified is not None and _not_modified_since(request, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+
+def json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Resposta de um payload JSON já serializado (ex.: vindo de cache), com 304 se o ETag bater"""
+    headers = _cache_headers(etag)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and _etag_matches(etag, if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _cache_headers(etag: str) -> dict:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={settings.HTTP_CACHE_MAX_AGE}, must-revalidate",
+        "Vary": "Authorization",
+    }
+
+
+def _not_modified_since(request: Request, last_modified: datetime) -> bool:
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # Cabeçalho HTTP tem precisão de segundos
+    return last_modified.replace(microsecond=0) <= since
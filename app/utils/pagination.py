@@ -0,0 +1,30 @@
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+
+def encode_cursor(timestamp: datetime, id: int) -> str:
+    """Cursor opaco para paginação por chave (timestamp, id)"""
+    raw = f"{timestamp.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Decodifica um cursor gerado por encode_cursor (None = primeira página)"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(query, timestamp_column, id_column, before: Optional[Tuple[datetime, int]]):
+    """Ordena por (timestamp desc, id desc) e filtra os registros anteriores ao cursor"""
+    if before is not None:
+        query = query.filter(tuple_(timestamp_column, id_column) < tuple_(*before))
+    return query.order_by(timestamp_column.desc(), id_column.desc())
@@ -0,0 +1,76 @@
+import contextvars
+from contextlib import contextmanager
+from typing import List, Optional
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_current: contextvars.ContextVar[Optional["QueryCounter"]] = contextvars.ContextVar(
+    "query_counter", default=None
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Mais queries que o orçamento permitido"""
+
+
+class QueryCounter:
+    """Queries executadas no contexto atual (requisição, bloco de teste, script)"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements: List[str] = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    if counter is not None:
+        counter.count += 1
+        counter.statements.append(statement)
+
+
+def install_query_counter(*engines: Engine) -> None:
+    """Registra a contagem nos engines (para o async, passar async_engine.sync_engine)"""
+    for engine in engines:
+        if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+@contextmanager
+def count_queries():
+    """Conta as queries executadas dentro do bloco"""
+    counter = QueryCounter()
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(budget: int):
+    """Falha com QueryBudgetExceeded se o bloco executar mais de `budget` queries"""
+    with count_queries() as counter:
+        yield counter
+    if counter.count > budget:
+        raise QueryBudgetExceeded(
+            f"{counter.count} queries (budget {budget}):\n" + "\n".join(counter.statements)
+        )
+
+
+def query_budget_middleware(budget: int, strict: bool = False):
+    """Middleware HTTP que mede as queries por requisição e expõe X-Query-Count"""
+
+    async def middleware(request: Request, call_next):
+        with count_queries() as counter:
+            response = await call_next(request)
+        if counter.count > budget:
+            message = f"{request.method} {request.url.path}: {counter.count} queries (budget {budget})"
+            print(f"Query budget exceeded: {message}")
+            if strict:
+                return JSONResponse(status_code=500, content={"detail": f"Query budget exceeded: {message}"})
+        response.headers["X-Query-Count"] = str(counter.count)
+        return response
+
+    return middleware
@@ -0,0 +1,111 @@
+import json
+import math
+from dataclasses import dataclass
+from typing import List, Optional
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from app.core.cache import CacheBackend, get_cache_backend
+from app.core.security import decode_access_token
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+_KEYS = ("ip", "user", "email")
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """Limite de uma rota: capacidade do bucket e recarga (tokens por segundo)"""
+    method: str
+    path: str
+    key: str
+    capacity: int
+    refill_rate: float
+
+    @classmethod
+    def parse(cls, spec: str) -> "RateLimitRule":
+        """Formato "<MÉTODO|*> <caminho[*]> <ip|user|email> <N>/<second|minute|hour>" """
+        try:
+            method, path, key, rate = spec.split()
+            count, _, period = rate.partition("/")
+            capacity = int(count)
+            refill_rate = capacity / _PERIODS[period]
+        except (ValueError, KeyError) as e:
+            raise ValueError(f"Invalid rate limit rule: {spec!r}") from e
+        if key not in _KEYS or capacity <= 0:
+            raise ValueError(f"Invalid rate limit rule: {spec!r}")
+        return cls(method=method.upper(), path=path, key=key, capacity=capacity, refill_rate=refill_rate)
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.method != "*" and self.method != method:
+            return False
+        if self.path.endswith("*"):
+            return path.startswith(self.path[:-1])
+        return path == self.path
+
+
+def _client_ip(request: Request) -> str:
+    # Atrás do Nginx o uvicorn já aplica o X-Forwarded-For (--proxy-headers)
+    return request.client.host if request.client else "unknown"
+
+
+def _principal(request: Request) -> str:
+    """Usuário do access token (só assinatura, sem banco); sem token válido, o IP"""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        payload = decode_access_token(token)
+        if payload is not None and payload.get("sub") is not None:
+            return f"user:{payload['sub']}"
+    return f"ip:{_client_ip(request)}"
+
+
+async def _login_email(request: Request) -> str:
+    """Conta do corpo JSON ({"email": ...}) do login; corpo inválido cai no IP"""
+    try:
+        email = json.loads(await request.body()).get("email")
+    except (ValueError, AttributeError):
+        email = None
+    if isinstance(email, str) and email.strip():
+        return f"email:{email.strip().lower()}"
+    return f"ip:{_client_ip(request)}"
+
+
+class RateLimiter:
+    """Aplica as regras que casam com a requisição; o estado dos buckets fica no backend de cache"""
+
+    def __init__(self, rules: List[RateLimitRule], backend: Optional[CacheBackend] = None):
+        self.rules = rules
+        self.backend = backend or get_cache_backend()
+
+    async def check(self, request: Request) -> float:
+        """0 se a requisição pode seguir; senão, segundos até liberar"""
+        method, path = request.method, request.url.path
+        wait = 0.0
+        for index, rule in enumerate(self.rules):
+            if not rule.matches(method, path):
+                continue
+            if rule.key == "user":
+                ident = _principal(request)
+            elif rule.key == "email":
+                ident = await _login_email(request)
+            else:
+                ident = f"ip:{_client_ip(request)}"
+            key = f"ratelimit:{index}:{ident}"
+            wait = max(wait, await self.backend.take_token_async(key, rule.capacity, rule.refill_rate))
+        return wait
+
+
+def rate_limit_middleware(rules: List[str], backend: Optional[CacheBackend] = None):
+    """Middleware HTTP que responde 429 antes de rotas, dependências e sessões de banco"""
+    limiter = RateLimiter([RateLimitRule.parse(spec) for spec in rules], backend)
+
+    async def middleware(request: Request, call_next):
+        wait = await limiter.check(request)
+        if wait > 0:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests"},
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+        return await call_next(request)
+
+    return middleware
@@ -0,0 +1,44 @@
+"""
+Microbenchmark da verificação de access tokens (caminho comum a todas as rotas autenticadas)
+
+Uso: python bench_jwt.py [iterações]  (compara os backends JWT instalados, com e sem o cache de tokens)
+"""
+import sys
+import time
+from app.core import security
+from app.core.config import settings
+from app.core.jwt_backend import JWT_BACKENDS, get_jwt_backend
+
+
+def _rate(func, iterations: int) -> float:
+    """Chamadas por segundo"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - start)
+
+
+def main(iterations: int = 20000) -> None:
+    claims = {"sub": "1", "role": "engenheiro", "active": True, "type": "access"}
+    key, algorithms = settings.SECRET_KEY, [settings.ALGORITHM]
+    print(f"{iterations} decodificações por cenário ({settings.ALGORITHM})\n")
+
+    for name in JWT_BACKENDS:
+        try:
+            backend = get_jwt_backend(name)
+        except RuntimeError as e:
+            print(f"{name:>8}: indisponível ({e})")
+            continue
+        token = security.create_access_token(data=claims)
+        assert backend.decode(token, key, algorithms) is not None
+        print(f"{name:>8}: {_rate(lambda: backend.decode(token, key, algorithms), iterations):>10,.0f} tokens/s")
+
+    # decode_access_token com o backend configurado: tokens repetidos saem do cache
+    token = security.create_access_token(data=claims)
+    security.decode_access_token(token)
+    cached = _rate(lambda: security.decode_access_token(token), iterations)
+    print(f"\n{'cache':>8}: {cached:>10,.0f} tokens/s (JWT_BACKEND={settings.JWT_BACKEND}, token repetido)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
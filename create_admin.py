@@ -3,12 +3,11 @@ Script para criar um usuário gestor inicial
 """
 import sys
 from sqlalchemy.orm import Session
-from app.database.database import SessionLocal, engine
-from app.models.models import Base, User, UserRole
+from app.database.database import SessionLocal
+from app.models.models import User, UserRole
 from app.core.security import get_password_hash
 
-# Criar tabelas se não existirem
-Base.metadata.create_all(bind=engine)
+# Tabelas criadas pelas migrações: rodar `alembic upgrade head` antes
 
 def create_admin():
     db: Session = SessionLocal()
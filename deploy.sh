@@ -26,9 +26,9 @@ source venv/bin/activate
 echo -e "${YELLOW}📦 Instalando dependências...${NC}"
 pip install -r requirements.txt
 
-# Criar/atualizar tabelas do banco
+# Aplicar migrações do banco
 echo -e "${YELLOW}🗄️  Atualizando banco de dados...${NC}"
-python -c "from app.database.database import engine; from app.models.models import Base; Base.metadata.create_all(bind=engine)"
+alembic upgrade head
 
 # Reiniciar aplicação
 echo -e "${YELLOW}🔄 Reiniciando aplicação...${NC}"
@@ -0,0 +1,26 @@
+"""
+Script para recalcular o rollup diário de estatísticas (obra_daily_stats)
+e o feed de atividades (activity_events)
+"""
+from sqlalchemy.orm import Session
+from app.database.database import SessionLocal
+from app.crud.crud_stats import crud_obra_daily_stats
+from app.crud.crud_activity import crud_activity_event
+
+def rebuild_stats():
+    db: Session = SessionLocal()
+
+    try:
+        crud_obra_daily_stats.rebuild(db)
+        print("✅ Estatísticas diárias recalculadas com sucesso!")
+        crud_activity_event.rebuild(db)
+        print("✅ Feed de atividades recriado com sucesso!")
+    except Exception as e:
+        print(f"❌ Erro ao recalcular estatísticas: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🚀 Recalculando estatísticas diárias...")
+    rebuild_stats()
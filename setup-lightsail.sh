@@ -24,7 +24,10 @@ apt update && apt upgrade -y
 
 # 2. Instalar dependências
 echo -e "${YELLOW}📦 Instalando dependências...${NC}"
-apt install -y python3-pip python3-venv nginx supervisor git curl
+apt install -y python3-pip python3-venv nginx supervisor git curl redis-server
+
+# Redis: cache compartilhado entre os workers do uvicorn (--workers 2)
+systemctl enable --now redis-server
 
 # 3. Criar usuário para aplicação (se não existir)
 if ! id "ubuntu" &>/dev/null; then
@@ -76,6 +79,10 @@ ACCESS_TOKEN_EXPIRE_MINUTES=10080
 # Upload
 UPLOAD_DIR="uploads"
 MAX_UPLOAD_SIZE=10485760
+
+# Cache compartilhado: obrigatório com --workers > 1 (o Supervisor sobe 2 workers)
+CACHE_BACKEND=redis
+REDIS_URL=redis://localhost:6379/0
 EOF
     chown ubuntu:ubuntu .env
     echo -e "${RED}⚠️  ATENÇÃO: Edite o arquivo .env com suas credenciais!${NC}"
@@ -151,7 +158,7 @@ if [ "$STATUS" == "RUNNING" ]; then
     echo "2. Criar tabelas do banco:"
     echo "   ${YELLOW}cd /home/ubuntu/api${NC}"
     echo "   ${YELLOW}source venv/bin/activate${NC}"
-    echo "   ${YELLOW}python -c \"from app.database.database import engine; from app.models.models import Base; Base.metadata.create_all(bind=engine)\"${NC}"
+    echo "   ${YELLOW}alembic upgrade head${NC}"
     echo "   ${YELLOW}python create_admin.py${NC}"
     echo ""
     echo "3. Reiniciar aplicação:"
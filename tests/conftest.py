@@ -0,0 +1,78 @@
+"""
+Fixtures compartilhadas dos testes
+
+Testes com banco rodam só com TEST_DATABASE_URL apontando para um Postgres descartável
+(o schema public é recriado com `alembic upgrade head`):
+
+    TEST_DATABASE_URL=postgresql://postgres@localhost/sst_test python -m pytest -q tests
+"""
+import os
+import tempfile
+import pytest
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+# Antes de importar o app: engines e settings são criados no import
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("CACHE_BACKEND", "memory")
+os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp(prefix="sst-test-uploads-"))
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Banco de teste com o schema das migrações (pula sem TEST_DATABASE_URL ou Postgres fora do ar)"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL não definida")
+
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import exc, text
+    from app.database.database import engine
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA public CASCADE"))
+            conn.execute(text("CREATE SCHEMA public"))
+    except exc.OperationalError as e:
+        pytest.skip(f"Postgres indisponível: {e}")
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = Config(os.path.join(root, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(root, "alembic"))
+    command.upgrade(config, "head")
+    engine.dispose()
+    return engine
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    """Cliente HTTP da API sobre o banco de teste"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def login_as(client):
+    """Cria um usuário direto no banco e retorna os cabeçalhos de autenticação dele"""
+    from app.core.security import get_password_hash
+    from app.database.database import SessionLocal
+    from app.models.models import User
+
+    def login_as(email: str, role) -> dict:
+        with SessionLocal() as db:
+            db.add(User(
+                email=email, full_name=email.split("@")[0], role=role,
+                hashed_password=get_password_hash("secret1"),
+            ))
+            db.commit()
+        response = client.post("/api/v1/auth/login", json={"email": email, "password": "secret1"})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return login_as
@@ -0,0 +1,212 @@
+"""
+Testes do RedisCacheBackend contra o fakeredis (sem servidor Redis)
+
+Uso: pip install pytest "fakeredis[lua]" && python -m pytest -q tests
+"""
+import asyncio
+import threading
+import time
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # Scripts Lua (token bucket) no fakeredis
+
+from app.core.cache import RedisCacheBackend
+from app.services.template_cache import ChecklistTemplateCache
+
+# Porta fechada: conexão recusada na hora (Redis fora do ar)
+DOWN_URL = "redis://127.0.0.1:1/0"
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def make_backend(server, **kwargs) -> RedisCacheBackend:
+    """Backend de um worker, ligado ao servidor fake compartilhado"""
+    return RedisCacheBackend(client=fakeredis.FakeRedis(server=server), **kwargs)
+
+
+@pytest.fixture
+def backend(server):
+    backend = make_backend(server)
+    yield backend
+    backend.close()
+
+
+def test_get_set_delete(backend):
+    assert backend.get("a") is None
+    backend.set("a", b"1")
+    assert backend.get("a") == b"1"
+    backend.delete("a")
+    assert backend.get("a") is None
+
+
+def test_set_with_ttl_and_prefix(backend):
+    backend.set("a", b"1", ttl=30)
+    assert 0 < backend.client.ttl("sst:a") <= 30
+    assert backend.client.get("a") is None
+
+
+def test_add_only_if_missing(backend):
+    assert backend.add("a", b"1") is True
+    assert backend.add("a", b"2") is False
+    assert backend.get("a") == b"1"
+
+
+def test_values_shared_between_workers(server, backend):
+    other = make_backend(server)
+    backend.set("a", b"1")
+    assert other.get("a") == b"1"
+    assert other.add("a", b"2") is False
+
+
+def test_async_variants(backend):
+    async def run():
+        await backend.set_async("a", b"1")
+        assert await backend.get_async("a") == b"1"
+        assert await backend.add_async("a", b"2") is False
+
+    asyncio.run(run())
+
+
+def test_take_token_bucket(backend):
+    assert backend.take_token("rl", 2, 1.0) == 0.0
+    assert backend.take_token("rl", 2, 1.0) == 0.0
+    wait = backend.take_token("rl", 2, 1.0)
+    assert 0 < wait <= 1.0
+    # Estado expira quando o bucket estaria cheio de novo
+    assert 0 < backend.client.pttl("sst:rl") <= 2000
+
+
+def test_take_token_shared_between_workers(server, backend):
+    other = make_backend(server)
+    assert backend.take_token("rl", 1, 0.5) == 0.0
+    assert other.take_token("rl", 1, 0.5) > 0
+
+
+def test_take_token_refills(backend, monkeypatch):
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    assert backend.take_token("rl", 1, 10.0) == 0.0
+    assert backend.take_token("rl", 1, 10.0) > 0
+    monkeypatch.setattr(time, "time", lambda: now + 0.2)
+    assert backend.take_token("rl", 1, 10.0) == 0.0
+
+
+def test_invalidation_fan_out(server):
+    """Mensagem publicada por um worker chega a todos (inclusive ao próprio)"""
+    workers = [make_backend(server) for _ in range(3)]
+    received = {i: [] for i in range(len(workers))}
+    events = [threading.Event() for _ in workers]
+    for i, worker in enumerate(workers):
+        def handler(message, i=i):
+            received[i].append(message)
+            events[i].set()
+        worker.subscribe(handler)
+        worker.start()
+    try:
+        # Inscrição no canal é assíncrona (thread do listener)
+        deadline = time.monotonic() + 5
+        while workers[0].client.pubsub_numsub(workers[0].channel)[0][1] < len(workers):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+        workers[1].publish("revoke:7:1.0")
+        for event in events:
+            assert event.wait(5)
+        assert all(messages == ["revoke:7:1.0"] for messages in received.values())
+    finally:
+        for worker in workers:
+            worker.close()
+
+
+def test_handler_error_does_not_stop_dispatch(backend):
+    received = []
+
+    def failing(message):
+        raise ValueError("boom")
+
+    backend.subscribe(failing)
+    backend.subscribe(received.append)
+    backend._dispatch("templates:1")
+    assert received == ["templates:1"]
+
+
+def test_template_cache_version_bump(server):
+    """Escrita em um worker invalida as entradas de todos"""
+    worker_a = ChecklistTemplateCache(make_backend(server))
+    worker_b = ChecklistTemplateCache(make_backend(server))
+    loads = []
+
+    def load():
+        loads.append(1)
+        return []
+
+    first = worker_a.get_or_load(1, 0, 100, load)
+    assert worker_a.get_or_load(1, 0, 100, load) == first
+    assert worker_b.get_or_load(1, 0, 100, load) == first  # Lido do Redis, sem consultar o banco
+    assert len(loads) == 1
+
+    version = worker_a.version(1)
+    worker_b.bump(1)
+    assert worker_a.version(1) != version
+    worker_a.get_or_load(1, 0, 100, load)
+    assert len(loads) == 2
+    # Outra obra não é afetada
+    worker_a.get_or_load(2, 0, 100, load)
+    worker_b.get_or_load(2, 0, 100, load)
+    assert len(loads) == 3
+
+
+def test_redis_down_is_a_miss():
+    backend = RedisCacheBackend(DOWN_URL)
+    try:
+        assert backend.get("a") is None
+        backend.set("a", b"1")
+        backend.delete("a")
+        backend.publish("revoke:1:1.0")
+        assert backend.add("a", b"1") is False
+    finally:
+        backend.close()
+
+
+def test_redis_down_async_is_a_miss():
+    backend = RedisCacheBackend(DOWN_URL)
+
+    async def run():
+        assert await backend.get_async("a") is None
+        assert await backend.add_async("a", b"1") is False
+        assert await backend.take_token_async("rl", 1, 1.0) == 0.0
+
+    try:
+        asyncio.run(run())
+    finally:
+        backend.close()
+
+
+def test_redis_down_rate_limit_fails_open():
+    backend = RedisCacheBackend(DOWN_URL)
+    try:
+        assert all(backend.take_token("rl", 1, 0.1) == 0.0 for _ in range(3))
+    finally:
+        backend.close()
+
+
+def test_redis_down_template_cache_loads_from_database():
+    cache = ChecklistTemplateCache(RedisCacheBackend(DOWN_URL))
+    loads = []
+
+    def load():
+        loads.append(1)
+        return []
+
+    try:
+        assert cache.version(1) is None
+        assert cache.get_or_load(1, 0, 100, load).body == b"[]"
+        cache.get_or_load(1, 0, 100, load)
+        assert len(loads) == 2  # Sem versão não há cache: sempre do banco
+        cache.bump(1)  # Não falha
+    finally:
+        cache.backend.close()
@@ -0,0 +1,93 @@
+"""
+Sync incremental do catálogo: obras, templates e items removidos ou desativados
+chegam nas listas deleted_* do delta
+"""
+import pytest
+from app.crud.crud_checklist import crud_checklist_template
+from app.database.database import SessionLocal
+from app.models.models import ChecklistTemplate, UserRole
+
+API = "/api/v1"
+
+
+@pytest.fixture(scope="module")
+def crew(client, login_as):
+    gestor = login_as("gestor.tomb@x.com", UserRole.GESTOR)
+    engineer = login_as("eng.tomb@x.com", UserRole.ENGENHEIRO)
+    engineer_id = client.get(f"{API}/auth/me", headers=engineer).json()["id"]
+    return {"gestor": gestor, "engineer": engineer, "engineer_id": engineer_id}
+
+
+def _obra_with_template(client, crew, nome: str) -> dict:
+    gestor = crew["gestor"]
+    obra = client.post(f"{API}/obras/", json={"nome": nome}, headers=gestor).json()
+    response = client.post(
+        f"{API}/obras/{obra['id']}/engineers", json={"engineer_id": crew["engineer_id"]}, headers=gestor
+    )
+    assert response.status_code == 201, response.text
+    items = [{"titulo": f"Item {n}", "ordem": n} for n in range(2)]
+    template = client.post(
+        f"{API}/obras/{obra['id']}/checklists", json={"nome": "Template", "items": items}, headers=gestor
+    ).json()
+    return {"obra": obra["id"], "template": template["id"], "items": [item["id"] for item in template["items"]]}
+
+
+def _delta(client, crew, since: str = None) -> dict:
+    params = {"since": since} if since else {}
+    response = client.get(f"{API}/mobile/catalog", params=params, headers=crew["engineer"])
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_deactivated_obra_is_deleted_until_reactivated(client, crew):
+    ids = _obra_with_template(client, crew, "Obra desativada")
+    watermark = _delta(client, crew)["watermark"]
+
+    client.put(f"{API}/obras/{ids['obra']}", json={"is_active": False}, headers=crew["gestor"])
+    delta = _delta(client, crew, watermark)
+    assert ids["obra"] in delta["deleted_obras"]
+    assert ids["obra"] not in [obra["id"] for obra in delta["obras"]]
+    assert ids["template"] not in [template["id"] for template in delta["templates"]]
+
+    client.put(f"{API}/obras/{ids['obra']}", json={"is_active": True}, headers=crew["gestor"])
+    delta = _delta(client, crew, watermark)
+    assert ids["obra"] not in delta["deleted_obras"]
+    assert ids["obra"] in [obra["id"] for obra in delta["obras"]]
+    assert ids["template"] in [template["id"] for template in delta["templates"]]
+
+
+def test_removed_obra_is_deleted(client, crew):
+    ids = _obra_with_template(client, crew, "Obra removida")
+    watermark = _delta(client, crew)["watermark"]
+
+    response = client.delete(f"{API}/obras/{ids['obra']}", headers=crew["gestor"])
+    assert response.status_code == 204, response.text
+    assert ids["obra"] in _delta(client, crew, watermark)["deleted_obras"]
+
+
+def test_obra_with_checkins_cannot_be_removed(client, crew):
+    ids = _obra_with_template(client, crew, "Obra com check-in")
+    checkin = {"obra_id": ids["obra"], "latitude": 1.0, "longitude": 2.0}
+    assert client.post(f"{API}/mobile/checkin", json=checkin, headers=crew["engineer"]).status_code == 201
+
+    response = client.delete(f"{API}/obras/{ids['obra']}", headers=crew["gestor"])
+    assert response.status_code == 409, response.text
+
+
+def test_removed_and_deactivated_templates_and_items(client, crew):
+    ids = _obra_with_template(client, crew, "Obra dos templates")
+    other = client.post(
+        f"{API}/obras/{ids['obra']}/checklists", json={"nome": "Outro", "items": []}, headers=crew["gestor"]
+    ).json()["id"]
+    watermark = _delta(client, crew)["watermark"]
+
+    with SessionLocal() as db:
+        crud_checklist_template.remove_item(db, item_id=ids["items"][0])
+        crud_checklist_template.remove(db, id=other)
+        template = db.get(ChecklistTemplate, ids["template"])
+        crud_checklist_template.update(db, db_obj=template, obj_in={"is_active": False})
+
+    delta = _delta(client, crew, watermark)
+    assert delta["deleted_template_items"] == [ids["items"][0]]
+    assert set(delta["deleted_templates"]) == {other, ids["template"]}
+    assert not {other, ids["template"]} & {template["id"] for template in delta["templates"]}
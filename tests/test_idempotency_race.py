@@ -0,0 +1,70 @@
+"""
+Corrida entre retries com o mesmo Idempotency-Key: só a violação do índice único
+da chave vira replay; outras IntegrityError sobem
+"""
+import pytest
+from sqlalchemy.exc import IntegrityError
+from app.crud.crud_checkin import crud_checkin
+from app.crud.crud_submission import crud_checklist_submission
+from app.database.database import AsyncSessionLocal
+from app.models.models import UserRole
+from app.schemas.schemas import CheckInCreate, ChecklistSubmissionCreate
+
+API = "/api/v1"
+
+
+@pytest.fixture(scope="module")
+def ids(client, login_as):
+    gestor = login_as("gestor.race@x.com", UserRole.GESTOR)
+    engineer = login_as("eng.race@x.com", UserRole.ENGENHEIRO)
+    obra = client.post(f"{API}/obras/", json={"nome": "Obra corrida"}, headers=gestor).json()
+    template = client.post(
+        f"{API}/obras/{obra['id']}/checklists", json={"nome": "Template", "items": []}, headers=gestor
+    ).json()
+    engineer_id = client.get(f"{API}/auth/me", headers=engineer).json()["id"]
+    return {"engineer": engineer_id, "obra": obra["id"], "template": template["id"]}
+
+
+@pytest.fixture
+def run(client):
+    """Executa a criação numa sessão própria (como cada requisição concorrente), no event loop do app"""
+    def run(create, **kwargs):
+        async def go():
+            async with AsyncSessionLocal() as db:
+                return await create(db, **kwargs)
+
+        return client.portal.call(go)
+
+    return run
+
+
+def test_checkin_same_key_returns_existing(ids, run):
+    checkin = CheckInCreate(obra_id=ids["obra"], latitude=1.0, longitude=2.0)
+    kwargs = {"obj_in": checkin, "engineer_id": ids["engineer"], "idempotency_key": "race-checkin"}
+    first = run(crud_checkin.create_checkin_async, **kwargs)
+    assert run(crud_checkin.create_checkin_async, **kwargs).id == first.id
+
+
+def test_checkin_other_violation_is_raised(ids, run):
+    checkin = CheckInCreate(obra_id=10 ** 9, latitude=1.0, longitude=2.0)  # FK inexistente
+    with pytest.raises(IntegrityError):
+        run(
+            crud_checkin.create_checkin_async,
+            obj_in=checkin, engineer_id=ids["engineer"], idempotency_key="race-checkin-fk",
+        )
+
+
+def test_submission_same_key_returns_existing(ids, run):
+    submission = ChecklistSubmissionCreate(template_id=ids["template"], responses=[])
+    kwargs = {"obj_in": submission, "engineer_id": ids["engineer"], "idempotency_key": "race-submission"}
+    first = run(crud_checklist_submission.create_submission_async, **kwargs)
+    assert run(crud_checklist_submission.create_submission_async, **kwargs).id == first.id
+
+
+def test_submission_other_violation_is_raised(ids, run):
+    submission = ChecklistSubmissionCreate(template_id=10 ** 9, responses=[])
+    with pytest.raises(IntegrityError):
+        run(
+            crud_checklist_submission.create_submission_async,
+            obj_in=submission, engineer_id=ids["engineer"], idempotency_key="race-submission-fk",
+        )
@@ -0,0 +1,83 @@
+"""
+Orçamento de queries das rotas mais usadas (regressão de N+1)
+
+Os dados têm várias obras, templates e items: uma relação carregada item a item
+estoura o orçamento, que não depende do tamanho da massa de dados.
+"""
+import pytest
+from app.database.database import async_engine, engine
+from app.models.models import UserRole
+from app.utils.query_counter import assert_max_queries, install_query_counter
+
+API = "/api/v1"
+OBRAS = 4
+TEMPLATES_PER_OBRA = 3
+ITEMS_PER_TEMPLATE = 5
+
+# (método, rota) -> máximo de queries por requisição (autenticação não consulta o banco)
+ENDPOINT_BUDGETS = {
+    ("GET", "/obras/"): 1,
+    ("GET", "/mobile/obras"): 1,
+    ("GET", "/mobile/catalog"): 4,
+    ("POST", "/mobile/sync"): 8,
+    ("GET", "/dashboard/stats"): 1,
+}
+
+
+@pytest.fixture(scope="module")
+def seeded(client, login_as):
+    """Gestor e engenheiro com obras, templates e items atribuídos"""
+    gestor = login_as("gestor.budget@x.com", UserRole.GESTOR)
+    engineer = login_as("eng.budget@x.com", UserRole.ENGENHEIRO)
+    engineer_id = client.get(f"{API}/auth/me", headers=engineer).json()["id"]
+
+    obra_ids, template_ids = [], []
+    for i in range(OBRAS):
+        obra = client.post(f"{API}/obras/", json={"nome": f"Obra {i}"}, headers=gestor).json()
+        obra_ids.append(obra["id"])
+        response = client.post(f"{API}/obras/{obra['id']}/engineers", json={"engineer_id": engineer_id}, headers=gestor)
+        assert response.status_code == 201, response.text
+        for t in range(TEMPLATES_PER_OBRA):
+            items = [{"titulo": f"Item {n}", "ordem": n} for n in range(ITEMS_PER_TEMPLATE)]
+            response = client.post(
+                f"{API}/obras/{obra['id']}/checklists", json={"nome": f"Template {t}", "items": items}, headers=gestor
+            )
+            assert response.status_code == 201, response.text
+            template_ids.append(response.json()["id"])
+
+    install_query_counter(engine, async_engine.sync_engine)
+    return {"gestor": gestor, "engineer": engineer, "obra_ids": obra_ids, "template_ids": template_ids}
+
+
+def _sync_batch(seeded: dict) -> dict:
+    return {
+        "checkins": [
+            {"idempotency_key": f"budget-c{i}", "obra_id": obra_id, "latitude": 1.0, "longitude": 2.0}
+            for i, obra_id in enumerate(seeded["obra_ids"] * 3)
+        ],
+        "submissions": [
+            {"idempotency_key": f"budget-s{i}", "template_id": template_id, "responses": []}
+            for i, template_id in enumerate(seeded["template_ids"])
+        ],
+    }
+
+
+def _request(client, seeded, method: str, path: str):
+    if path.startswith("/mobile"):
+        headers = seeded["engineer"]
+    else:
+        headers = seeded["gestor"]
+    if method == "POST":
+        return client.post(API + path, json=_sync_batch(seeded), headers=headers)
+    return client.get(API + path, headers=headers)
+
+
+@pytest.mark.parametrize("method, path", list(ENDPOINT_BUDGETS), ids=[" ".join(key) for key in ENDPOINT_BUDGETS])
+def test_endpoint_query_budget(client, seeded, method, path):
+    budget = ENDPOINT_BUDGETS[(method, path)]
+    with assert_max_queries(budget) as counter:
+        response = _request(client, seeded, method, path)
+    assert response.status_code == 200, response.text
+    if method == "POST":
+        results = response.json()
+        assert all(item["status"] == "created" for item in results["checkins"] + results["submissions"]), results
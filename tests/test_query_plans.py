@@ -0,0 +1,204 @@
+"""
+Planos (EXPLAIN) das consultas mais frequentes: devem usar os índices das migrações
+
+A massa de dados é gravada numa transação desfeita ao final e as tabelas são analisadas
+(ANALYZE): com volume realista o índice vence por custo, sem desligar o seq scan.
+"""
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select, text
+from app.models.models import (
+    ActivityEvent,
+    CheckIn,
+    ChecklistItemResponse,
+    ChecklistSubmission,
+    ChecklistTemplate,
+    ChecklistTemplateItem,
+    Obra,
+    SyncTombstone,
+)
+from app.crud.crud_obra import crud_obra
+from app.crud.crud_stats import crud_obra_daily_stats
+from app.utils.pagination import keyset_page
+
+NOW = datetime.now(timezone.utc)
+
+# Volume: 200 gestores x 25 obras, 2000 engenheiros com 10 obras cada, 4 templates por obra
+SEED_SQL = """
+INSERT INTO users (email, hashed_password, full_name, role, is_active)
+SELECT 'plan-g' || g || '@x.com', 'x', 'Gestor ' || g, 'GESTOR', true FROM generate_series(1, 200) g;
+INSERT INTO users (email, hashed_password, full_name, role, is_active)
+SELECT 'plan-e' || e || '@x.com', 'x', 'Eng ' || e, 'ENGENHEIRO', true FROM generate_series(1, 2000) e;
+CREATE TEMP TABLE plan_gestores ON COMMIT DROP AS
+    SELECT row_number() OVER (ORDER BY id) AS n, id FROM users WHERE email LIKE 'plan-g%';
+CREATE TEMP TABLE plan_engineers ON COMMIT DROP AS
+    SELECT row_number() OVER (ORDER BY id) AS n, id FROM users WHERE email LIKE 'plan-e%';
+
+INSERT INTO obras (nome, gestor_id, is_active)
+SELECT 'plan-obra-' || o, g.id, true FROM generate_series(1, 5000) o JOIN plan_gestores g ON g.n = o % 200 + 1;
+CREATE TEMP TABLE plan_obras ON COMMIT DROP AS
+    SELECT row_number() OVER (ORDER BY id) AS n, id, gestor_id FROM obras WHERE nome LIKE 'plan-obra-%';
+
+INSERT INTO obra_engineers (obra_id, engineer_id)
+SELECT o.id, e.id FROM plan_engineers e, generate_series(0, 9) k
+JOIN plan_obras o ON true WHERE o.n = (e.n * 10 + k) % 5000 + 1;
+
+INSERT INTO checklist_templates (obra_id, nome, is_active)
+SELECT o.id, 'Template ' || t, true FROM plan_obras o, generate_series(1, 4) t;
+INSERT INTO checklist_template_items (template_id, titulo, ordem)
+SELECT t.id, 'Item ' || i, i FROM checklist_templates t, generate_series(1, 5) i;
+
+INSERT INTO checkins (engineer_id, obra_id, latitude, longitude, checkin_time)
+SELECT e.id, o.id, 0, 0, now() - make_interval(mins => c)
+FROM generate_series(1, 100000) c
+JOIN plan_engineers e ON e.n = c % 2000 + 1
+JOIN plan_obras o ON o.n = c % 5000 + 1;
+
+INSERT INTO checklist_submissions (template_id, engineer_id, submitted_at)
+SELECT t.id, e.id, now() - make_interval(mins => s)
+FROM generate_series(1, 50000) s
+JOIN plan_engineers e ON e.n = s % 2000 + 1
+JOIN (SELECT row_number() OVER (ORDER BY id) AS n, id FROM checklist_templates) t ON t.n = s % 20000 + 1;
+ANALYZE checklist_submissions, checklist_template_items;  -- Join abaixo com estatísticas atuais
+INSERT INTO checklist_item_responses (submission_id, template_item_id, status)
+SELECT s.id, i.item_id, 'CONFORME'
+FROM checklist_submissions s
+JOIN (SELECT template_id, min(id) AS item_id FROM checklist_template_items GROUP BY template_id) i
+    ON i.template_id = s.template_id
+CROSS JOIN generate_series(1, 2);
+
+INSERT INTO activity_events (gestor_id, obra_id, user_id, tipo, ref_id, obra_nome, usuario_nome, created_at)
+SELECT o.gestor_id, o.id, e.id, 'checkin', a, 'Obra', 'Eng', now() - make_interval(mins => a)
+FROM generate_series(1, 100000) a
+JOIN plan_obras o ON o.n = a % 5000 + 1
+JOIN plan_engineers e ON e.n = a % 2000 + 1;
+
+INSERT INTO sync_tombstones (engineer_id, entity, entity_id, deleted_at)
+SELECT e.id, 'obra', t, now() - make_interval(hours => t)
+FROM generate_series(1, 20000) t JOIN plan_engineers e ON e.n = t % 2000 + 1;
+
+INSERT INTO obra_daily_stats (gestor_id, obra_id, day, checkins, submissions, conforme, nao_conforme, pendente, nao_aplicavel)
+SELECT o.gestor_id, o.id, current_date - d, 1, 1, 1, 0, 0, 0 FROM plan_obras o, generate_series(0, 19) d;
+
+ANALYZE;
+"""
+
+# consulta (a partir dos ids de exemplo) -> índice esperado no plano (ou tupla de índices aceitos)
+HOT_QUERIES = {
+    "acesso do engenheiro à obra": (
+        lambda ids: crud_obra._engineer_access_query(obra_id=ids["obra"], engineer_id=ids["engineer"]),
+        ("ix_obra_engineers_engineer_obra", "ix_obra_engineers_obra"),
+    ),
+    "obras do gestor": (
+        lambda ids: select(Obra).filter(Obra.gestor_id == ids["gestor"]).limit(100),
+        "ix_obras_gestor",
+    ),
+    "templates da obra": (
+        lambda ids: select(ChecklistTemplate).filter(ChecklistTemplate.obra_id == ids["obra"]).limit(100),
+        "ix_checklist_templates_obra",
+    ),
+    "items dos templates (selectinload)": (
+        lambda ids: select(ChecklistTemplateItem).filter(ChecklistTemplateItem.template_id.in_(ids["templates"])),
+        "ix_checklist_template_items_template",
+    ),
+    "check-ins do engenheiro (cursor)": (
+        lambda ids: keyset_page(
+            select(CheckIn).filter(CheckIn.engineer_id == ids["engineer"]), CheckIn.checkin_time, CheckIn.id, ids["cursor"]
+        ).limit(100),
+        "ix_checkins_engineer_time",
+    ),
+    "check-ins da obra (cursor)": (
+        lambda ids: keyset_page(
+            select(CheckIn).filter(CheckIn.obra_id == ids["obra"]), CheckIn.checkin_time, CheckIn.id, ids["cursor"]
+        ).limit(100),
+        "ix_checkins_obra_time",
+    ),
+    "submissões do engenheiro (cursor)": (
+        lambda ids: keyset_page(
+            select(ChecklistSubmission).filter(ChecklistSubmission.engineer_id == ids["engineer"]),
+            ChecklistSubmission.submitted_at, ChecklistSubmission.id, ids["cursor"],
+        ).limit(100),
+        "ix_checklist_submissions_engineer_time",
+    ),
+    "submissões do template (cursor)": (
+        lambda ids: keyset_page(
+            select(ChecklistSubmission).filter(ChecklistSubmission.template_id == ids["templates"][0]),
+            ChecklistSubmission.submitted_at, ChecklistSubmission.id, ids["cursor"],
+        ).limit(100),
+        "ix_checklist_submissions_template_time",
+    ),
+    "respostas das submissões (selectinload)": (
+        lambda ids: select(ChecklistItemResponse).filter(ChecklistItemResponse.submission_id.in_(ids["submissions"])),
+        "ix_checklist_item_responses_submission",
+    ),
+    "feed de atividades (cursor)": (
+        lambda ids: keyset_page(
+            select(ActivityEvent).filter(ActivityEvent.gestor_id == ids["gestor"]),
+            ActivityEvent.created_at, ActivityEvent.id, ids["cursor"],
+        ).limit(10),
+        "ix_activity_events_gestor_created",
+    ),
+    "remoções do engenheiro (sync incremental)": (
+        lambda ids: select(SyncTombstone).filter(
+            SyncTombstone.engineer_id == ids["engineer"], SyncTombstone.deleted_at > NOW - timedelta(days=7)
+        ),
+        "ix_sync_tombstones_engineer_deleted",
+    ),
+    "rollup do gestor": (
+        lambda ids: crud_obra_daily_stats.totals_query(gestor_id=ids["gestor"], since=NOW.date() - timedelta(days=7)),
+        "ix_obra_daily_stats_gestor_day",
+    ),
+    "rollup da obra": (
+        lambda ids: crud_obra_daily_stats.totals_query(obra_id=ids["obra"]),
+        "ix_obra_daily_stats_obra_day",
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def seeded_conn(database):
+    """Conexão com a massa de dados gravada e analisada (desfeita ao final)"""
+    with database.connect() as conn:
+        trans = conn.begin()
+        try:
+            # Cursor do driver: script com vários comandos, sem parâmetros
+            with conn.connection.cursor() as cursor:
+                cursor.execute(SEED_SQL)
+            scalar = lambda sql: conn.execute(text(sql)).scalar()
+            ids = {
+                "gestor": scalar("SELECT id FROM plan_gestores WHERE n = 1"),
+                "engineer": scalar("SELECT id FROM plan_engineers WHERE n = 1"),
+                "obra": scalar("SELECT id FROM plan_obras WHERE n = 1"),
+                "templates": conn.execute(text("SELECT id FROM checklist_templates ORDER BY id DESC LIMIT 3")).scalars().all(),
+                "submissions": conn.execute(text("SELECT id FROM checklist_submissions ORDER BY id DESC LIMIT 3")).scalars().all(),
+                "cursor": (NOW - timedelta(days=1), 1 << 30),
+            }
+            yield conn, ids
+        finally:
+            trans.rollback()
+
+
+def _plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+def test_hot_query_uses_index(seeded_conn, name):
+    conn, ids = seeded_conn
+    build, expected = HOT_QUERIES[name]
+    expected = (expected,) if isinstance(expected, str) else expected
+    query = build(ids)
+    compiled = query.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", dict(compiled.params)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    nodes = list(_plan_nodes(plan[0]["Plan"]))
+    used = {node["Index Name"] for node in nodes if "Index Name" in node}
+    seq_scans = [node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"]
+    assert used & set(expected) and not seq_scans, (
+        f"esperado {' ou '.join(expected)}; índices usados {sorted(used)}, seq scans {seq_scans}"
+    )
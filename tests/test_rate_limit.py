@@ -0,0 +1,55 @@
+"""
+Rate limiting do login: por conta (email do corpo), com teto separado por IP
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.cache import MemoryCacheBackend
+from app.utils.rate_limit import RateLimitRule, rate_limit_middleware
+
+LOGIN = "/api/v1/auth/login"
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.middleware("http")(rate_limit_middleware(
+        [f"POST {LOGIN} email 2/minute", f"POST {LOGIN} ip 5/minute"], MemoryCacheBackend()
+    ))
+
+    @app.post(LOGIN)
+    async def login(body: dict):
+        return body  # O corpo lido pelo middleware continua disponível para a rota
+
+    return TestClient(app)
+
+
+def login(client, email) -> int:
+    response = client.post(LOGIN, json={"email": email, "password": "x"})
+    if response.status_code == 200:
+        assert response.json()["email"] == email
+    return response.status_code
+
+
+def test_login_limited_per_account(client):
+    assert [login(client, "a@x.com") for _ in range(3)] == [200, 200, 429]
+    # Mesmo IP (colegas atrás do mesmo NAT), outra conta: bucket próprio
+    assert login(client, "b@x.com") == 200
+    # Maiúsculas/espaços não geram outra conta
+    assert login(client, " A@X.com ") == 429
+
+
+def test_login_ip_ceiling(client):
+    codes = [login(client, f"user{n}@x.com") for n in range(6)]
+    assert codes == [200] * 5 + [429]
+
+
+def test_login_without_email_falls_back_to_ip(client):
+    codes = [client.post(LOGIN, content=b"not json").status_code for _ in range(3)]
+    assert codes[2] == 429
+
+
+def test_parse_rejects_unknown_key():
+    assert RateLimitRule.parse(f"POST {LOGIN} email 10/minute").key == "email"
+    with pytest.raises(ValueError):
+        RateLimitRule.parse(f"POST {LOGIN} header 10/minute")
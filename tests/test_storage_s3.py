@@ -0,0 +1,121 @@
+"""
+Testes do S3Storage contra o moto (S3 simulado em memória, sem rede)
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import pytest
+
+pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from app.services.storage import S3Storage
+
+BUCKET = "sst-test"
+KEY = "checklist/direct/ab/cd/foto.jpg"
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    with moto.mock_aws():
+        storage = S3Storage(BUCKET, region="us-east-1")
+        storage.client.create_bucket(Bucket=BUCKET)
+        yield storage
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_put_exists_download_delete(storage, tmp_path):
+    source = tmp_path / "foto.jpg"
+    source.write_bytes(b"\xff\xd8\xff conteudo")
+
+    assert run(storage.exists(KEY)) is False
+    run(storage.put_file(str(source), KEY, "image/jpeg"))
+    assert not source.exists()  # Arquivo local é consumido no envio
+    assert run(storage.exists(KEY)) is True
+    assert storage.client.head_object(Bucket=BUCKET, Key=KEY)["ContentType"] == "image/jpeg"
+
+    target = tmp_path / "baixado.jpg"
+    run(storage.download(KEY, str(target)))
+    assert target.read_bytes() == b"\xff\xd8\xff conteudo"
+
+    assert run(storage.delete(KEY)) is True
+    assert run(storage.exists(KEY)) is False
+    assert run(storage.delete(KEY)) is False
+
+
+def test_put_guesses_content_type(storage, tmp_path):
+    source = tmp_path / "manifest.json"
+    source.write_text("{}")
+    run(storage.put_file(str(source), "checklist/ab/manifest.json"))
+    head = storage.client.head_object(Bucket=BUCKET, Key="checklist/ab/manifest.json")
+    assert head["ContentType"] == "application/json"
+
+
+def test_presigned_upload_binds_checksum(storage):
+    content = b"\x89PNG\r\n\x1a\n imagem"
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    upload = storage.presigned_upload(KEY, content_type="image/png", max_size=1024, expires=60, sha256=sha256)
+
+    fields = upload["fields"]
+    assert fields["key"] == KEY
+    assert fields["Content-Type"] == "image/png"
+    assert fields["x-amz-checksum-algorithm"] == "SHA256"
+    # S3 espera o digest em base64, não em hex
+    assert base64.b64decode(fields["x-amz-checksum-sha256"]) == hashlib.sha256(content).digest()
+    assert base64.b64decode(fields["x-amz-checksum-sha256"]).hex() == sha256
+
+    # A política assinada exige os mesmos valores e limita o tamanho
+    policy = json.loads(base64.b64decode(fields["policy"]))
+    conditions = policy["conditions"]
+    assert {"x-amz-checksum-algorithm": "SHA256"} in conditions
+    assert {"x-amz-checksum-sha256": fields["x-amz-checksum-sha256"]} in conditions
+    assert {"Content-Type": "image/png"} in conditions
+    assert ["content-length-range", 1, 1024] in conditions
+    assert {"bucket": BUCKET} in conditions and {"key": KEY} in conditions
+
+
+def test_url_uses_public_url():
+    with moto.mock_aws():
+        assert S3Storage(BUCKET, region="us-east-1").url(KEY) == f"https://{BUCKET}.s3.amazonaws.com/{KEY}"
+        custom = S3Storage(BUCKET, region="us-east-1", public_url="https://cdn.example.com/")
+        assert custom.url(KEY) == f"https://cdn.example.com/{KEY}"
+        minio = S3Storage(BUCKET, region="us-east-1", endpoint_url="http://minio:9000")
+        assert minio.url(KEY) == f"http://minio:9000/{BUCKET}/{KEY}"
+
+
+def test_direct_upload_flow(storage):
+    """Presign, envio do formulário pelo cliente e confirmação com conferência do hash"""
+    requests = pytest.importorskip("requests")
+    from fastapi import HTTPException
+    from app.services.file_service import DIRECT_UPLOAD_PREFIX, FileUploadService
+
+    service = FileUploadService(storage=storage)
+    content = b"\xff\xd8\xff foto da obra"
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    presigned = run(service.presign_checklist_photo(sha256=sha256, content_type="image/jpeg", size=len(content)))
+    assert presigned["exists"] is False
+    upload = presigned["upload"]
+    response = requests.post(upload["url"], data=upload["fields"], files={"file": ("foto.jpg", content)})
+    assert response.status_code in (200, 204), response.text
+    assert run(service.confirm_checklist_photo(presigned["filename"])) == presigned["filename"]
+
+    # Conteúdo já armazenado: nenhum upload novo sobre a chave
+    again = run(service.presign_checklist_photo(sha256=sha256, content_type="image/jpeg", size=len(content)))
+    assert again == {"filename": presigned["filename"], "exists": True, "upload": None}
+
+    # Objeto com outro conteúdo sob o hash declarado: recusado e removido
+    other = hashlib.sha256(b"outro").hexdigest()
+    key = service._content_path(other, ".jpg", prefix=DIRECT_UPLOAD_PREFIX)
+    storage.client.put_object(Bucket=BUCKET, Key=key, Body=content)
+    with pytest.raises(HTTPException) as exc:
+        run(service.confirm_checklist_photo(key))
+    assert exc.value.status_code == 400
+    assert run(storage.exists(key)) is False
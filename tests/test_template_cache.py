@@ -0,0 +1,29 @@
+"""
+Cache de templates com o backend "memory" (um cache por worker)
+"""
+import time
+from app.core import cache as cache_module
+from app.core.cache import MemoryCacheBackend
+from app.core.config import settings
+from app.services.template_cache import ChecklistTemplateCache
+
+
+def test_memory_backend_entries_expire_quickly(monkeypatch):
+    """A escrita em outro worker não invalida este: a entrada vale só o TTL local"""
+    now = time.monotonic()
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now)
+    worker = ChecklistTemplateCache(MemoryCacheBackend())
+    assert worker.ttl == min(settings.TEMPLATE_CACHE_TTL_SECONDS, settings.TEMPLATE_CACHE_LOCAL_TTL_SECONDS)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return []
+
+    worker.get_or_load(1, 0, 100, load)
+    worker.get_or_load(1, 0, 100, load)
+    assert len(loads) == 1
+
+    now += worker.ttl
+    worker.get_or_load(1, 0, 100, load)
+    assert len(loads) == 2